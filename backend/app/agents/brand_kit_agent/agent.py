@@ -3,7 +3,7 @@ Brand Kit Extraction Agent.
 Orchestrates logo, color, and external scraping to extract brand information.
 """
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Union
 from datetime import datetime, timezone
 
 from app.agents.base_agent import BaseAgent
@@ -11,7 +11,7 @@ from app.agents.brand_kit_agent.extractors.logo_extractor import logo_extractor
 from app.agents.brand_kit_agent.extractors.color_extractor import color_extractor
 from app.agents.brand_kit_agent.extractors.external_scraper import external_scraper
 from app.services.logger import app_logger
-from app.services.storage_service import storage_service
+from app.services.storage_service import get_storage_service
 
 
 class BrandKitAgent(BaseAgent):
@@ -157,8 +157,8 @@ class BrandKitAgent(BaseAgent):
     
     def extract_from_uploads(
         self,
-        brand_logo_file: Optional[bytes] = None,
-        product_image_file: Optional[bytes] = None,
+        brand_logo_file: Optional[Union[bytes, Path]] = None,
+        product_image_file: Optional[Union[bytes, Path]] = None,
         brand_website_url: Optional[str] = None,
         run_id: str = None
     ) -> Dict:
@@ -166,8 +166,8 @@ class BrandKitAgent(BaseAgent):
         Extract brand kit from uploaded files.
         
         Args:
-            brand_logo_file: Brand logo file content as bytes
-            product_image_file: Product image file content as bytes
+            brand_logo_file: Brand logo file content as bytes, or path to a logo file on disk
+            product_image_file: Product image file content as bytes, or path to an image on disk
             brand_website_url: Optional brand website URL
             run_id: Run ID for organizing files
         
@@ -176,10 +176,19 @@ class BrandKitAgent(BaseAgent):
         """
         logo_path = None
         product_path = None
+        storage_service = get_storage_service()
         
         try:
-            # Save uploaded files temporarily
-            if brand_logo_file:
+            # Save uploaded files temporarily; files already on disk are
+            # copied directly instead of being read into memory first
+            if isinstance(brand_logo_file, Path):
+                logo_path = storage_service.copy_into_storage(
+                    brand_logo_file,
+                    "brand_assets/logo",
+                    f"logo_upload{brand_logo_file.suffix}"
+                )
+                self.logger.info(f"Copied logo to: {logo_path}")
+            elif brand_logo_file:
                 logo_path = storage_service.save_brand_asset(
                     brand_logo_file,
                     "logo_upload.png",
@@ -187,7 +196,14 @@ class BrandKitAgent(BaseAgent):
                 )
                 self.logger.info(f"Saved logo to: {logo_path}")
             
-            if product_image_file:
+            if isinstance(product_image_file, Path):
+                product_path = storage_service.copy_into_storage(
+                    product_image_file,
+                    "brand_assets/product",
+                    f"product_upload{product_image_file.suffix}"
+                )
+                self.logger.info(f"Copied product image to: {product_path}")
+            elif product_image_file:
                 product_path = storage_service.save_brand_asset(
                     product_image_file,
                     "product_upload.jpg",
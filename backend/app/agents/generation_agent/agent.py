@@ -9,7 +9,6 @@ from app.agents.base_agent import BaseAgent
 from app.agents.generation_agent.prompt_engineer import prompt_engineer
 from app.agents.generation_agent.variation_generator import variation_generator
 from app.services.logger import app_logger
-from app.services.storage_service import storage_service
 
 
 class GenerationAgent(BaseAgent):
@@ -8,7 +8,7 @@ from datetime import datetime
 
 from app.agents.generation_agent.providers.vertex_imagen import imagen_provider
 from app.agents.generation_agent.providers.vertex_veo import veo_provider
-from app.services.storage_service import storage_service
+from app.services.storage_service import get_storage_service
 from app.services.logger import app_logger
 
 
@@ -49,6 +49,7 @@ class VariationGenerator:
         prompts = prompts[:num_variations]
         
         # Create output directory
+        storage_service = get_storage_service()
         output_dir = storage_service.get_storage_path("ads") / run_id
         output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -2,23 +2,74 @@
 Main API routes for BrandAI.
 """
 import asyncio
+import functools
+import time
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse, FileResponse
+from typing import Dict, Optional, Tuple
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, Response
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse, StreamingResponse
 
 from app.models.request import AdGenerationRequest, MediaType
 from app.models.response import GenerationResponse, StatusResponse, FinalResponse
 from app.models.run import RunStatus
 from app.core.orchestrator import orchestrator
+from app.config import settings
 from app.core.run_manager import run_manager
 from app.core.exceptions import RunNotFoundError, ValidationError, WorkflowError, FileUploadError
-from app.services.storage_service import storage_service
+from app.api.streaming_form import parse_streamed_form
 from app.services.logger import app_logger
 
 router = APIRouter()
 
+# Lookup sets for request validation and media discovery
+_ALLOWED_IMAGE_EXT = frozenset({".jpg", ".jpeg", ".png", ".webp"})
+_IMAGE_EXT = frozenset({".png", ".jpg", ".jpeg", ".webp", ".gif"})
+_VIDEO_EXT = frozenset({".mp4", ".webm", ".mov"})
+_MEDIA_EXT = _IMAGE_EXT | _VIDEO_EXT
+
+# Rough completion estimates in seconds: 2 min for image, 5 min for video
+_ESTIMATED_TIME = {"image": 120, "video": 300}
+_GENERATION_STARTED_MSG = "Ad generation started. Use the run_id to check status."
+
+# Text fields read from the /generate form; any others are dropped unbuffered
+_GENERATE_FIELDS = frozenset({"prompt", "media_type", "brand_website_url"})
+
+# Upload form fields -> brand asset type
+_UPLOAD_FIELDS = {"logo": "logo", "product": "product"}
+
+# Status stream: how often a run is checked for changes, and how long the
+# stream may stay quiet before a keep-alive comment is sent (seconds)
+_STATUS_STREAM_INTERVAL = 0.5
+_STATUS_STREAM_KEEPALIVE = 15.0
+_TERMINAL_STATUSES = frozenset({RunStatus.COMPLETED, RunStatus.FAILED, RunStatus.CANCELLED})
+
+# OpenAPI description of the /generate form, which is parsed by hand
+_GENERATE_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "required": ["prompt", "media_type"],
+                "properties": {
+                    "prompt": {"type": "string", "description": "Description of how the ad should be and what it should convey"},
+                    "media_type": {"type": "string", "enum": ["image", "video"], "description": "Type of media to generate: 'image' or 'video'"},
+                    "brand_website_url": {"type": "string", "description": "Optional brand website URL for scraping brand kit information"},
+                    "logo": {"type": "string", "format": "binary", "description": "Brand logo image file"},
+                    "product": {"type": "string", "format": "binary", "description": "Product image file"},
+                },
+            }
+        }
+    },
+}
+
+# Shared pool for running the blocking orchestrator off the event loop
+_WORKFLOW_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.WORKFLOW_CONCURRENCY,
+    thread_name_prefix="brandai-wf"
+)
+
 
 @router.get("/")
 async def root():
@@ -37,25 +88,26 @@ async def root():
     }
 
 
-@router.post("/generate", response_model=GenerationResponse)
-async def generate_ad(
-    background_tasks: BackgroundTasks,
-    prompt: str = Form(..., description="Description of how the ad should be and what it should convey"),
-    media_type: str = Form(..., description="Type of media to generate: 'image' or 'video'"),
-    brand_website_url: Optional[str] = Form(None, description="Optional brand website URL for scraping brand kit information"),
-    logo: Optional[UploadFile] = File(None, description="Brand logo image file"),
-    product: Optional[UploadFile] = File(None, description="Product image file")
-):
+@router.post(
+    "/generate",
+    response_model=GenerationResponse,
+    openapi_extra={"requestBody": _GENERATE_REQUEST_BODY}
+)
+async def generate_ad(request: Request, background_tasks: BackgroundTasks):
     """
     Generate an advertisement (image or video).
     
     This endpoint:
-    1. Accepts file uploads (logo, product images)
+    1. Streams file uploads (logo, product images) directly to storage
     2. Validates input
     3. Creates a run and starts the workflow in background
     4. Returns run_id for status tracking
     
-    Args:
+    The multipart body is parsed here rather than through Form/File
+    parameters so uploads are written once, to their final path, instead
+    of being spooled to a temporary file first.
+    
+    Form fields:
         prompt: Description of the ad
         media_type: 'image' or 'video'
         brand_website_url: Optional brand website URL
@@ -66,79 +118,24 @@ async def generate_ad(
         GenerationResponse with run_id and status
     """
     try:
-        app_logger.info(f"Received /generate request: prompt_length={len(prompt) if prompt else 0}, media_type={media_type}, has_logo={logo is not None}, has_product={product is not None}")
-        
-        # Validate inputs
-        if not prompt or len(prompt.strip()) < 10:
-            app_logger.error(f"Invalid prompt: length={len(prompt) if prompt else 0}")
-            raise ValidationError("Prompt must be at least 10 characters long")
-        
-        # Validate and convert media_type
-        media_type_str = str(media_type).lower().strip()
-        if media_type_str not in ["image", "video"]:
-            app_logger.error(f"Invalid media_type: {media_type}")
-            raise ValidationError("media_type must be 'image' or 'video'")
-        
-        # Convert to MediaType enum for internal use
-        media_type_enum = MediaType(media_type_str)
-        
-        # Save uploaded files
-        logo_path = None
-        product_path = None
-        
-        if logo:
-            try:
-                # Validate file type
-                if not logo.filename:
-                    raise FileUploadError("Logo file must have a filename")
-                
-                # Check file extension
-                logo_ext = Path(logo.filename).suffix.lower()
-                if logo_ext not in [".jpg", ".jpeg", ".png", ".webp"]:
-                    raise FileUploadError(f"Logo file must be an image (jpg, jpeg, png, webp), got: {logo_ext}")
-                
-                # Read file content
-                logo_content = await logo.read()
-                if len(logo_content) == 0:
-                    raise FileUploadError("Logo file is empty")
-                
-                # Save file
-                logo_path = storage_service.save_brand_asset(
-                    file_content=logo_content,
-                    asset_type="logo",
-                    filename=logo.filename
-                )
-                app_logger.info(f"Logo saved: {logo_path}")
-            
-            except Exception as e:
-                raise FileUploadError(f"Error saving logo: {str(e)}")
+        # Parse form, streaming logo/product to brand asset storage
+        form = await parse_streamed_form(request, _GENERATE_FIELDS, _UPLOAD_FIELDS, _ALLOWED_IMAGE_EXT)
+        logo_path = form.files.get("logo")
+        product_path = form.files.get("product")
         
-        if product:
-            try:
-                # Validate file type
-                if not product.filename:
-                    raise FileUploadError("Product file must have a filename")
-                
-                # Check file extension
-                product_ext = Path(product.filename).suffix.lower()
-                if product_ext not in [".jpg", ".jpeg", ".png", ".webp"]:
-                    raise FileUploadError(f"Product file must be an image (jpg, jpeg, png, webp), got: {product_ext}")
-                
-                # Read file content
-                product_content = await product.read()
-                if len(product_content) == 0:
-                    raise FileUploadError("Product file is empty")
-                
-                # Save file
-                product_path = storage_service.save_brand_asset(
-                    file_content=product_content,
-                    asset_type="product",
-                    filename=product.filename
-                )
-                app_logger.info(f"Product saved: {product_path}")
-            
-            except Exception as e:
-                raise FileUploadError(f"Error saving product: {str(e)}")
+        try:
+            prompt, media_type_str, brand_website_url = _validate_generate_fields(form.fields)
+        except ValidationError:
+            form.discard_files()
+            raise
+        
+        app_logger.info(
+            "Received /generate request: prompt_length={}, media_type={}, has_logo={}, has_product={}",
+            len(prompt), media_type_str, logo_path is not None, product_path is not None
+        )
+        for label, path in (("Logo", logo_path), ("Product", product_path)):
+            if path:
+                app_logger.info("{} saved: {}", label, path)
         
         # Create run
         run = run_manager.create_run(
@@ -148,7 +145,7 @@ async def generate_ad(
         )
         run_id = run.run_id
         
-        app_logger.info(f"Created run {run_id} for {media_type_str} generation")
+        app_logger.info("Created run {} for {} generation", run_id, media_type_str)
         
         # Start workflow in background (non-blocking)
         background_tasks.add_task(
@@ -161,19 +158,16 @@ async def generate_ad(
             product_path=str(product_path) if product_path else None
         )
         
-        app_logger.info(f"Background task added for run {run_id}, returning response immediately")
-        
-        # Estimate time (rough estimates)
-        estimated_time = 120 if media_type_str == "image" else 300  # 2 min for image, 5 min for video
+        app_logger.info("Background task added for run {}, returning response immediately", run_id)
         
         response = GenerationResponse(
             run_id=run_id,
             status=RunStatus.PENDING,
-            message="Ad generation started. Use the run_id to check status.",
-            estimated_time=estimated_time
+            message=_GENERATION_STARTED_MSG,
+            estimated_time=_ESTIMATED_TIME[media_type_str]
         )
         
-        app_logger.info(f"Returning response for run {run_id}")
+        app_logger.info("Returning response for run {}", run_id)
         return response
     
     except ValidationError as e:
@@ -195,6 +189,44 @@ async def generate_ad(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+def _validate_generate_fields(fields: Dict[str, str]) -> Tuple[str, str, Optional[str]]:
+    """
+    Validate the text fields of a /generate form.
+    
+    Args:
+        fields: Parsed form fields
+    
+    Returns:
+        Tuple of (prompt, media_type, brand_website_url)
+    
+    Raises:
+        ValidationError: If a field is missing or invalid
+    """
+    prompt = fields.get("prompt", "")
+    if len(prompt.strip()) < 10:
+        app_logger.error(f"Invalid prompt: length={len(prompt)}")
+        raise ValidationError("Prompt must be at least 10 characters long")
+    
+    media_type = fields.get("media_type", "")
+    try:
+        media_type_str = MediaType(media_type.lower().strip()).value
+    except ValueError:
+        app_logger.error(f"Invalid media_type: {media_type}")
+        raise ValidationError("media_type must be 'image' or 'video'")
+    
+    return prompt, media_type_str, fields.get("brand_website_url") or None
+
+
+def shutdown_workflow_executor():
+    """Stop the shared workflow executor, dropping runs that haven't started."""
+    _WORKFLOW_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+
+def _etag(version: float) -> str:
+    """Build a weak ETag from a run's Unix timestamp."""
+    return f'W/"{version}"'
+
+
 async def execute_workflow(
     run_id: str,
     prompt: str,
@@ -205,35 +237,39 @@ async def execute_workflow(
 ):
     """Execute workflow in background (non-blocking)."""
     try:
-        app_logger.info(f"Starting workflow execution for run {run_id}")
+        app_logger.info("Starting workflow execution for run {}", run_id)
         
         # Run synchronous orchestrator.execute() in thread pool to avoid blocking event loop
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            result = await loop.run_in_executor(
-                executor,
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            _WORKFLOW_EXECUTOR,
+            functools.partial(
                 orchestrator.execute,
-                run_id,
-                prompt,
-                media_type,
-                brand_website_url,
-                logo_path,
-                product_path,
-                3  # max_retries
+                run_id=run_id,
+                user_prompt=prompt,
+                media_type=media_type,
+                brand_website_url=brand_website_url,
+                logo_path=logo_path,
+                product_path=product_path,
+                max_retries=3
             )
+        )
         
-        app_logger.info(f"Workflow completed for run {run_id}: {result.get('status')}")
+        app_logger.info("Workflow completed for run {}: {}", run_id, result.get('status'))
     
     except Exception as e:
         app_logger.error(f"Error executing workflow for run {run_id}: {e}")
         run_manager.fail_run(run_id, str(e))
 
 
-@router.get("/status/{run_id}", response_model=StatusResponse)
-async def get_status(run_id: str):
+@router.get("/status/{run_id}", response_model=StatusResponse, response_class=ORJSONResponse)
+async def get_status(run_id: str, request: Request, response: Response):
     """
     Get the status of an ad generation run.
     
+    Sends an ETag derived from the run's last update and answers
+    304 Not Modified when the client's If-None-Match still matches.
+    
     Args:
         run_id: Unique run ID returned from /generate endpoint
     
@@ -241,26 +277,17 @@ async def get_status(run_id: str):
         StatusResponse with current status and progress
     """
     try:
-        run = run_manager.get_run(run_id)
+        run = run_manager.snapshot(run_id)
         
         if not run:
             raise RunNotFoundError(run_id)
         
-        # Check if workflow is complete
-        if run.status == RunStatus.COMPLETED:
-            # Get final result if available
-            # The orchestrator stores results in run_manager
-            pass
-        
-        return StatusResponse(
-            run_id=run.run_id,
-            status=run.status,
-            progress=run.progress,
-            current_stage=run.current_stage,
-            message=run.error_message if run.status == RunStatus.FAILED else None,
-            created_at=run.created_at,
-            updated_at=run.updated_at
-        )
+        etag = _etag(run.updated_at_ts)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        
+        return _status_response(run)
     
     except RunNotFoundError as e:
         raise HTTPException(status_code=404, detail=e.message)
@@ -269,11 +296,80 @@ async def get_status(run_id: str):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.get("/result/{run_id}", response_model=FinalResponse)
-async def get_result(run_id: str):
+@router.get("/status/{run_id}/stream")
+async def stream_status(run_id: str, request: Request):
+    """
+    Stream status updates for a run as Server-Sent Events.
+    
+    Sends the current status right away, then one event each time the
+    run changes, and ends the stream once the run completes or fails.
+    
+    Args:
+        run_id: Unique run ID returned from /generate endpoint
+    
+    Returns:
+        text/event-stream response whose events carry StatusResponse JSON
+    """
+    if run_manager.snapshot(run_id) is None:
+        raise HTTPException(status_code=404, detail=RunNotFoundError(run_id).message)
+    
+    async def events():
+        last_version = None
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            run = run_manager.snapshot(run_id)
+            if run is None:
+                # Deleted or evicted while streaming
+                return
+            
+            if run.updated_at_ts != last_version:
+                last_version = run.updated_at_ts
+                last_sent = time.monotonic()
+                yield f"data: {_status_response(run).model_dump_json()}\n\n"
+                if RunStatus(run.status) in _TERMINAL_STATUSES:
+                    return
+            elif time.monotonic() - last_sent >= _STATUS_STREAM_KEEPALIVE:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            
+            await asyncio.sleep(_STATUS_STREAM_INTERVAL)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _status_response(run) -> StatusResponse:
+    """
+    Build the status payload for a run snapshot.
+    
+    Args:
+        run: RunSnapshot to describe
+    
+    Returns:
+        StatusResponse for the run
+    """
+    return StatusResponse(
+        run_id=run.run_id,
+        status=run.status,
+        progress=run.progress,
+        current_stage=run.current_stage,
+        message=run.error_message if run.status == RunStatus.FAILED else None,
+        created_at=run.created_at,
+        updated_at=run.updated_at
+    )
+
+
+@router.get("/result/{run_id}", response_model=FinalResponse, response_class=ORJSONResponse)
+async def get_result(run_id: str, request: Request, response: Response):
     """
     Get the final result of a completed ad generation run.
     
+    Supports conditional requests via ETag / If-None-Match, keyed on
+    the run's completion time.
+    
     Args:
         run_id: Unique run ID
     
@@ -281,7 +377,7 @@ async def get_result(run_id: str):
         FinalResponse with generated ad and critique report
     """
     try:
-        run = run_manager.get_run(run_id)
+        run = run_manager.snapshot(run_id)
         
         if not run:
             raise RunNotFoundError(run_id)
@@ -292,6 +388,11 @@ async def get_result(run_id: str):
                 detail=f"Run {run_id} is not completed yet. Current status: {run.status}"
             )
         
+        etag = _etag(run.completed_at.timestamp() if run.completed_at else run.updated_at_ts)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        
         # Get critique report if available (only for scores, not for file paths)
         critique_report = None
         variations = []
@@ -300,19 +401,19 @@ async def get_result(run_id: str):
         storage_dir = settings.storage_dir
         ads_dir = storage_dir / "ads" / run_id
         
-        app_logger.info(f"Scanning for generated files in: {ads_dir}")
+        app_logger.info("Scanning for generated files in: {}", ads_dir)
         if ads_dir.exists() and ads_dir.is_dir():
             # Find all image and video files
             for file_path in sorted(ads_dir.iterdir()):  # Sort for consistent ordering
                 if file_path.is_file():
                     ext = file_path.suffix.lower()
-                    if ext in [".png", ".jpg", ".jpeg", ".webp", ".gif", ".mp4", ".webm", ".mov"]:
+                    if ext in _MEDIA_EXT:
                         # Get relative path from storage_dir (e.g., "ads/{run_id}/var_1.png")
                         relative_path = file_path.relative_to(storage_dir)
                         media_path = str(relative_path).replace('\\', '/')  # Normalize path separators
                         
                         # Determine media type
-                        media_type = "video" if ext in [".mp4", ".webm", ".mov"] else "image"
+                        media_type = "video" if ext in _VIDEO_EXT else "image"
                         
                         # Extract variation_id from filename (e.g., var_1.png -> var_1)
                         variation_id = file_path.stem  # Gets filename without extension
@@ -323,11 +424,11 @@ async def get_result(run_id: str):
                             "media_type": media_type,
                             "overall_score": 0.0  # Will be populated from critique_report if available
                         })
-                        app_logger.info(f"Found generated file: {variation_id} -> {media_path}")
+                        app_logger.info("Found generated file: {} -> {}", variation_id, media_path)
         else:
             app_logger.warning(f"Directory does not exist: {ads_dir}")
         
-        app_logger.info(f"Found {len(variations)} files in storage directory: {ads_dir}")
+        app_logger.info("Found {} files in storage directory: {}", len(variations), ads_dir)
         
         # Get critique report ONLY to update scores, NOT for file paths
         if run.critique_results:
@@ -338,7 +439,7 @@ async def get_result(run_id: str):
                 critique_data = run.critique_results if isinstance(run.critique_results, dict) else run.critique_results.dict() if hasattr(run.critique_results, 'dict') else {}
                 critique_report = CritiqueReport(**critique_data)
                 
-                app_logger.info(f"Critique report loaded: {len(critique_report.all_variations) if critique_report.all_variations else 0} variations")
+                app_logger.info("Critique report loaded: {} variations", len(critique_report.all_variations) if critique_report.all_variations else 0)
                 
                 # Update overall_score from critique report if variations already found
                 if critique_report.all_variations and variations:
@@ -356,7 +457,7 @@ async def get_result(run_id: str):
                         var_id = var.get('variation_id', '')
                         if var_id in score_map:
                             var['overall_score'] = score_map[var_id]
-                            app_logger.info(f"Updated score for {var_id}: {score_map[var_id]}")
+                            app_logger.info("Updated score for {}: {}", var_id, score_map[var_id])
             except Exception as e:
                 app_logger.warning(f"Error parsing critique report: {e}")
                 import traceback
@@ -366,10 +467,10 @@ async def get_result(run_id: str):
         if not variations:
             app_logger.warning(f"No generated files found in {ads_dir} for run {run_id}")
         
-        app_logger.info(f"Returning {len(variations)} variations in result")
+        app_logger.info("Returning {} variations in result", len(variations))
         if variations:
             for var in variations:
-                app_logger.info(f"  Variation: {var['variation_id']} - {var['file_path']} ({var['media_type']})")
+                app_logger.info("  Variation: {} - {} ({})", var['variation_id'], var['file_path'], var['media_type'])
         
         # Create response with variations
         response_data = {
@@ -405,7 +506,7 @@ async def serve_media(path: str):
         FileResponse with the media file
     """
     try:
-        app_logger.info(f"Media request received: {path}")
+        app_logger.info("Media request received: {}", path)
         
         # Remove leading slash if present
         path = path.lstrip('/')
@@ -414,8 +515,13 @@ async def serve_media(path: str):
         storage_dir = settings.storage_dir
         file_path = storage_dir / path
         
-        app_logger.info(f"Storage dir: {storage_dir}, Requested path: {path}, Full path: {file_path}")
-        app_logger.info(f"File exists: {file_path.exists()}, Is file: {file_path.is_file() if file_path.exists() else False}")
+        app_logger.info("Storage dir: {}, Requested path: {}, Full path: {}", storage_dir, path, file_path)
+        # Lazy so the filesystem probes only run when INFO is enabled
+        app_logger.opt(lazy=True).info(
+            "File exists: {}, Is file: {}",
+            file_path.exists,
+            lambda: file_path.is_file() if file_path.exists() else False
+        )
         
         # Security: Ensure path is within storage directory
         try:
@@ -437,14 +543,14 @@ async def serve_media(path: str):
         # Determine media type
         ext = file_path.suffix.lower()
         media_type = None
-        if ext in [".jpg", ".jpeg", ".png", ".webp", ".gif"]:
+        if ext in _IMAGE_EXT:
             media_type = f"image/{ext[1:]}" if ext != ".jpg" else "image/jpeg"
-        elif ext in [".mp4", ".webm", ".mov"]:
+        elif ext in _VIDEO_EXT:
             media_type = f"video/{ext[1:]}" if ext != ".mov" else "video/quicktime"
         else:
             media_type = "application/octet-stream"
         
-        app_logger.info(f"Serving media file: {file_path} (type: {media_type})")
+        app_logger.info("Serving media file: {} (type: {})", file_path, media_type)
         
         return FileResponse(
             path=str(file_path),
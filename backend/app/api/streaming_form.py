@@ -0,0 +1,222 @@
+"""
+Streaming multipart/form-data parsing for upload endpoints.
+
+Parses the request body as it arrives and writes file parts straight to
+their final location in storage, instead of letting FastAPI spool each
+upload to a temporary file and copying it afterwards.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import aiofiles
+from fastapi import Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.exceptions import FileUploadError, ValidationError
+from app.services.storage_service import get_storage_service
+
+# Largest accepted value for a non-file form field (1 MiB)
+MAX_FIELD_SIZE = 1 << 20
+
+
+@dataclass
+class StreamedForm:
+    """Parsed form: text fields plus paths of file parts saved to storage."""
+    fields: Dict[str, str] = field(default_factory=dict)
+    files: Dict[str, Path] = field(default_factory=dict)
+    
+    def discard_files(self):
+        """Delete all saved files (e.g. when the request is rejected)."""
+        for path in self.files.values():
+            path.unlink(missing_ok=True)
+        self.files.clear()
+
+
+class _FormWriter:
+    """Applies parsed multipart events, writing file parts with aiofiles."""
+    
+    def __init__(
+        self,
+        text_fields: FrozenSet[str],
+        file_fields: Dict[str, str],
+        allowed_extensions: FrozenSet[str]
+    ):
+        self.form = StreamedForm()
+        self._text_fields = text_fields
+        self._file_fields = file_fields
+        self._allowed_extensions = allowed_extensions
+        self._name: Optional[str] = None
+        self._value: Optional[bytearray] = None
+        self._file = None
+        self._path: Optional[Path] = None
+        self._size = 0
+    
+    async def begin(self, options: Dict[bytes, bytes]):
+        """Start a part from its Content-Disposition options."""
+        self._name = options.get(b"name", b"").decode("utf-8")
+        filename = options.get(b"filename")
+        
+        # Only buffer the text fields the endpoint reads; drop the rest
+        if filename is None:
+            if self._name in self._text_fields:
+                self._value = bytearray()
+            return
+        
+        # Ignore unexpected file fields and empty file inputs
+        asset_type = self._file_fields.get(self._name)
+        if asset_type is None or not filename:
+            return
+        
+        # A repeated field would replace (and orphan) the file already saved
+        if self._name in self.form.files:
+            raise FileUploadError(f"Only one {asset_type} file may be uploaded")
+        
+        # Drop any client-supplied directories from the filename
+        name = Path(filename.decode("utf-8")).name
+        ext = Path(name).suffix.lower()
+        if ext not in self._allowed_extensions:
+            allowed = ", ".join(sorted(e.lstrip(".") for e in self._allowed_extensions))
+            raise FileUploadError(f"{asset_type.capitalize()} file must be an image ({allowed}), got: {ext}")
+        
+        self._path = get_storage_service().brand_asset_path(name, asset_type)
+        self._file = await aiofiles.open(self._path, "wb")
+        self._size = 0
+    
+    async def data(self, chunk: bytes):
+        """Consume a chunk of the current part's body."""
+        if self._file is not None:
+            await self._file.write(chunk)
+            self._size += len(chunk)
+        elif self._value is not None:
+            self._value.extend(chunk)
+            if len(self._value) > MAX_FIELD_SIZE:
+                raise ValidationError(f"Form field '{self._name}' is too large")
+    
+    async def end(self):
+        """Finish the current part."""
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+            if self._size == 0:
+                self._path.unlink(missing_ok=True)
+                raise FileUploadError(f"{self._file_fields[self._name].capitalize()} file is empty")
+            self.form.files[self._name] = self._path
+        elif self._value is not None:
+            self.form.fields[self._name] = self._value.decode("utf-8")
+        
+        self._name = None
+        self._value = None
+        self._path = None
+    
+    async def abort(self):
+        """Close and delete anything written so far."""
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+            self._path.unlink(missing_ok=True)
+        self.form.discard_files()
+
+
+async def parse_streamed_form(
+    request: Request,
+    text_fields: FrozenSet[str],
+    file_fields: Dict[str, str],
+    allowed_extensions: FrozenSet[str]
+) -> StreamedForm:
+    """
+    Parse a multipart/form-data request, streaming file parts to storage.
+    
+    Args:
+        request: Incoming request (its body must not have been read yet)
+        text_fields: Names of the text fields to keep; other text parts are dropped
+        file_fields: Map of form field name -> brand asset type for file parts
+        allowed_extensions: Accepted lower-case file extensions (e.g. ".png")
+    
+    Returns:
+        StreamedForm with text fields and saved file paths
+    
+    Raises:
+        ValidationError: If the body is not a well-formed UTF-8 form or a field is too large
+        FileUploadError: If a file part has a bad extension, is empty or is repeated
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    
+    # URL-encoded forms can't carry files; let Starlette parse them
+    if content_type == b"application/x-www-form-urlencoded":
+        form_data = await request.form()
+        return StreamedForm(fields={
+            k: v for k, v in form_data.items() if k in text_fields and isinstance(v, str)
+        })
+    
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise ValidationError("Request must be multipart/form-data or application/x-www-form-urlencoded")
+    
+    # Parser callbacks run synchronously inside parser.write(), so they only
+    # record events; the writer then applies them in order with async I/O.
+    events: List[Tuple[str, Any]] = []
+    headers: Dict[bytes, bytes] = {}
+    header_field = bytearray()
+    header_value = bytearray()
+    
+    def on_header_field(data: bytes, start: int, end: int):
+        header_field.extend(data[start:end])
+    
+    def on_header_value(data: bytes, start: int, end: int):
+        header_value.extend(data[start:end])
+    
+    def on_header_end():
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+    
+    def on_headers_finished():
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        headers.clear()
+        events.append(("begin", options))
+    
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append(("data", data[start:end]))
+    
+    def on_part_end():
+        events.append(("end", None))
+    
+    parser = MultipartParser(boundary, {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    writer = _FormWriter(text_fields, file_fields, allowed_extensions)
+    
+    async def apply_events():
+        for kind, payload in events:
+            if kind == "begin":
+                await writer.begin(payload)
+            elif kind == "data":
+                await writer.data(payload)
+            else:
+                await writer.end()
+        events.clear()
+    
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            await apply_events()
+        parser.finalize()
+        await apply_events()
+    except MultipartParseError as e:
+        await writer.abort()
+        raise ValidationError("Malformed multipart/form-data body") from e
+    except UnicodeDecodeError as e:
+        await writer.abort()
+        raise ValidationError("Form field names, filenames and values must be UTF-8") from e
+    except Exception:
+        await writer.abort()
+        raise
+    
+    return writer.form
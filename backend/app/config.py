@@ -45,6 +45,20 @@ class Settings:
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
     
+    # CORS: comma-separated list of allowed browser origins
+    CORS_ORIGINS: list = [
+        origin.strip()
+        for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
+        if origin.strip()
+    ]
+    
+    # Workflow execution
+    WORKFLOW_CONCURRENCY: int = int(os.getenv("WORKFLOW_CONCURRENCY", "4"))
+    
+    # Run retention (in-memory run store)
+    RUN_TTL_SECONDS: int = int(os.getenv("RUN_TTL_SECONDS", "86400"))
+    MAX_RUNS: int = int(os.getenv("MAX_RUNS", "1000"))
+    
     @property
     def _is_docker(self) -> bool:
         """Check if running in Docker container."""
@@ -15,7 +15,7 @@ from app.agents.critique_agent.agent import CritiqueAgent
 from app.agents.refinement_agent.agent import RefinementAgent, RefinementStrategy
 from app.core.run_manager import run_manager
 from app.models.run import RunStatus
-from app.services.storage_service import storage_service
+from app.services.storage_service import get_storage_service
 from app.services.logger import app_logger
 import json
 
@@ -578,7 +578,7 @@ class WorkflowOrchestrator:
                         report_json = json.dumps(report_dict, indent=2, default=str)
                     
                     # Save to disk
-                    report_path = storage_service.save_report(
+                    report_path = get_storage_service().save_report(
                         report_content=report_json,
                         run_id=run_id,
                         report_type="critique"
@@ -2,25 +2,135 @@
 Run manager for tracking ad generation workflow runs.
 Uses in-memory storage for run status tracking.
 """
+import base64
+import time
 import uuid
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Optional, Dict
+from typing import Any, Optional, Dict, List, Set, Tuple
 from threading import Lock
 
+from app.config import settings
 from app.models.run import RunModel, RunStatus, RunStage
 
+# Number of independently locked partitions of the run store
+_SHARDS = 16
+
+# Statuses after which a run is kept only for settings.RUN_TTL_SECONDS
+_FINISHED_STATUSES = frozenset({RunStatus.COMPLETED, RunStatus.FAILED, RunStatus.CANCELLED})
+
+
+@dataclass(frozen=True, slots=True)
+class RunSnapshot:
+    """
+    Consistent read-only copy of the run fields the API responses need.
+    
+    Taken under the shard lock so fields from concurrent updates are
+    never mixed.
+    """
+    run_id: str
+    status: RunStatus
+    progress: float
+    current_stage: Optional[str]
+    error_message: Optional[str]
+    created_at: datetime
+    updated_at_ts: float
+    completed_at: Optional[datetime]
+    final_ad_path: Optional[str]
+    critique_results: Optional[Dict[str, Any]]
+    retry_count: int
+    
+    @property
+    def updated_at(self) -> datetime:
+        """Last update timestamp, materialized from updated_at_ts."""
+        return datetime.fromtimestamp(self.updated_at_ts, tz=timezone.utc)
+
 
 class RunManager:
     """
     In-memory run manager for tracking workflow runs.
     
-    Thread-safe implementation for concurrent access.
+    Thread-safe implementation for concurrent access. Runs are spread
+    across shards keyed by run ID, each with its own lock, so updates to
+    different runs don't contend. Reads are lock-free since a single
+    dict lookup is atomic under the GIL.
+    
+    Finished runs are kept for settings.RUN_TTL_SECONDS and the store is
+    capped at roughly settings.MAX_RUNS entries; the oldest finished runs
+    are dropped first. Runs still in progress are never evicted.
     """
     
     def __init__(self):
         """Initialize run manager with empty storage."""
-        self._runs: Dict[str, RunModel] = {}
-        self._lock = Lock()
+        self._shards: List["OrderedDict[str, RunModel]"] = [OrderedDict() for _ in range(_SHARDS)]
+        self._locks: List[Lock] = [Lock() for _ in range(_SHARDS)]
+        # Per-shard index of run IDs by status, guarded by the shard lock
+        self._by_status: List[Dict[RunStatus, Set[str]]] = [defaultdict(set) for _ in range(_SHARDS)]
+        self._max_per_shard = max(1, settings.MAX_RUNS // _SHARDS)
+    
+    def _shard(self, run_id: str) -> Tuple[Lock, "OrderedDict[str, RunModel]"]:
+        """
+        Get the lock and run dict responsible for a run ID.
+        
+        Args:
+            run_id: Run ID
+        
+        Returns:
+            Tuple of (shard lock, shard dict)
+        """
+        index = hash(run_id) % _SHARDS
+        return self._locks[index], self._shards[index]
+    
+    def _status_index(self, run_id: str) -> Dict[RunStatus, Set[str]]:
+        """
+        Get the status index of the shard holding a run ID.
+        
+        Args:
+            run_id: Run ID
+        
+        Returns:
+            Mapping of status to run IDs for that shard
+        """
+        return self._by_status[hash(run_id) % _SHARDS]
+    
+    def _set_status(self, run: RunModel, status: RunStatus) -> None:
+        """
+        Set a run's status and update the status index (caller holds the shard lock).
+        
+        Entering a finished status starts the run's retention window;
+        leaving one (e.g. on retry) clears it again.
+        
+        Args:
+            run: Run to update
+            status: New status
+        """
+        index = self._status_index(run.run_id)
+        # Normalize: run.status may hold the plain string value
+        index[RunStatus(run.status)].discard(run.run_id)
+        index[RunStatus(status)].add(run.run_id)
+        run.status = status
+        if RunStatus(status) in _FINISHED_STATUSES:
+            run._retention_deadline = time.time() + settings.RUN_TTL_SECONDS
+        else:
+            run._retention_deadline = None
+    
+    def _remove(self, runs: "OrderedDict[str, RunModel]", run_id: str) -> bool:
+        """
+        Remove a run from its shard and the status index (caller holds the shard lock).
+        
+        Args:
+            runs: Shard dict holding the run
+            run_id: Run ID
+        
+        Returns:
+            True if removed, False if run not found
+        """
+        run = runs.pop(run_id, None)
+        if run is None:
+            return False
+        self._status_index(run_id)[RunStatus(run.status)].discard(run_id)
+        return True
     
     def create_run(
         self,
@@ -50,8 +160,12 @@ class RunManager:
             progress=0.0
         )
         
-        with self._lock:
-            self._runs[run_id] = run
+        lock, runs = self._shard(run_id)
+        with lock:
+            runs[run_id] = run
+            self._status_index(run_id)[RunStatus(run.status)].add(run_id)
+            if len(runs) > self._max_per_shard:
+                self._evict_oldest_finished(runs)
         
         return run
     
@@ -65,8 +179,37 @@ class RunManager:
         Returns:
             RunModel if found, None otherwise
         """
-        with self._lock:
-            return self._runs.get(run_id)
+        return self._shard(run_id)[1].get(run_id)
+    
+    def snapshot(self, run_id: str) -> Optional[RunSnapshot]:
+        """
+        Take a consistent snapshot of a run for building API responses.
+        
+        Args:
+            run_id: Run ID
+        
+        Returns:
+            RunSnapshot if found, None otherwise
+        """
+        lock, runs = self._shard(run_id)
+        with lock:
+            run = runs.get(run_id)
+            if not run:
+                return None
+            
+            return RunSnapshot(
+                run_id=run.run_id,
+                status=run.status,
+                progress=run.progress,
+                current_stage=run.current_stage,
+                error_message=run.error_message,
+                created_at=run.created_at,
+                updated_at_ts=run.updated_at_ts,
+                completed_at=run.completed_at,
+                final_ad_path=run.final_ad_path,
+                critique_results=run.critique_results,
+                retry_count=run.retry_count
+            )
     
     def update_status(
         self,
@@ -75,7 +218,7 @@ class RunManager:
         progress: Optional[float] = None,
         current_stage: Optional[str] = None,
         error_message: Optional[str] = None
-    ) -> bool:
+    ) -> Optional[RunModel]:
         """
         Update run status.
         
@@ -87,15 +230,16 @@ class RunManager:
             error_message: Error message if failed
         
         Returns:
-            True if updated, False if run not found
+            Updated RunModel, None if run not found
         """
-        with self._lock:
-            run = self._runs.get(run_id)
+        lock, runs = self._shard(run_id)
+        with lock:
+            run = runs.get(run_id)
             if not run:
-                return False
+                return None
             
-            run.status = status
-            run.updated_at = datetime.now(timezone.utc)
+            self._set_status(run, status)
+            run.updated_at_ts = time.time()
             
             if progress is not None:
                 run.progress = max(0.0, min(100.0, progress))
@@ -106,14 +250,14 @@ class RunManager:
             if error_message is not None:
                 run.error_message = error_message
             
-            return True
+            return run
     
     def start_stage(
         self,
         run_id: str,
         stage_name: str,
         metadata: Optional[Dict] = None
-    ) -> bool:
+    ) -> Optional[RunModel]:
         """
         Start a workflow stage.
         
@@ -123,32 +267,34 @@ class RunManager:
             metadata: Optional stage metadata
         
         Returns:
-            True if started, False if run not found
+            Updated RunModel, None if run not found
         """
-        with self._lock:
-            run = self._runs.get(run_id)
+        lock, runs = self._shard(run_id)
+        with lock:
+            run = runs.get(run_id)
             if not run:
-                return False
+                return None
             
+            now = time.time()
             stage = RunStage(
                 stage_name=stage_name,
                 status=RunStatus.PENDING,
-                started_at=datetime.now(timezone.utc),
+                started_at=datetime.fromtimestamp(now, tz=timezone.utc),
                 metadata=metadata or {}
             )
             
             run.stages[stage_name] = stage
             run.current_stage = stage_name
-            run.updated_at = datetime.now(timezone.utc)
+            run.updated_at_ts = now
             
-            return True
+            return run
     
     def complete_stage(
         self,
         run_id: str,
         stage_name: str,
         metadata: Optional[Dict] = None
-    ) -> bool:
+    ) -> Optional[RunModel]:
         """
         Complete a workflow stage.
         
@@ -158,23 +304,25 @@ class RunManager:
             metadata: Optional stage metadata
         
         Returns:
-            True if completed, False if run not found
+            Updated RunModel, None if run not found
         """
-        with self._lock:
-            run = self._runs.get(run_id)
+        lock, runs = self._shard(run_id)
+        with lock:
+            run = runs.get(run_id)
             if not run:
-                return False
+                return None
             
+            now = time.time()
             if stage_name in run.stages:
                 stage = run.stages[stage_name]
                 stage.status = RunStatus.COMPLETED
-                stage.completed_at = datetime.now(timezone.utc)
+                stage.completed_at = datetime.fromtimestamp(now, tz=timezone.utc)
                 if metadata:
                     stage.metadata.update(metadata)
             
-            run.updated_at = datetime.now(timezone.utc)
+            run.updated_at_ts = now
             
-            return True
+            return run
     
     def fail_stage(
         self,
@@ -182,7 +330,7 @@ class RunManager:
         stage_name: str,
         error: str,
         metadata: Optional[Dict] = None
-    ) -> bool:
+    ) -> Optional[RunModel]:
         """
         Mark a workflow stage as failed.
         
@@ -193,26 +341,28 @@ class RunManager:
             metadata: Optional stage metadata
         
         Returns:
-            True if failed, False if run not found
+            Updated RunModel, None if run not found
         """
-        with self._lock:
-            run = self._runs.get(run_id)
+        lock, runs = self._shard(run_id)
+        with lock:
+            run = runs.get(run_id)
             if not run:
-                return False
+                return None
             
+            now = time.time()
             if stage_name in run.stages:
                 stage = run.stages[stage_name]
                 stage.status = RunStatus.FAILED
-                stage.completed_at = datetime.now(timezone.utc)
+                stage.completed_at = datetime.fromtimestamp(now, tz=timezone.utc)
                 stage.error = error
                 if metadata:
                     stage.metadata.update(metadata)
             
-            run.status = RunStatus.FAILED
+            self._set_status(run, RunStatus.FAILED)
             run.error_message = error
-            run.updated_at = datetime.now(timezone.utc)
+            run.updated_at_ts = now
             
-            return True
+            return run
     
     def update_run_data(
         self,
@@ -221,7 +371,7 @@ class RunManager:
         generated_ads: Optional[list] = None,
         critique_results: Optional[Dict] = None,
         final_ad_path: Optional[str] = None
-    ) -> bool:
+    ) -> Optional[RunModel]:
         """
         Update run data (results).
         
@@ -233,12 +383,13 @@ class RunManager:
             final_ad_path: Path to final selected ad
         
         Returns:
-            True if updated, False if run not found
+            Updated RunModel, None if run not found
         """
-        with self._lock:
-            run = self._runs.get(run_id)
+        lock, runs = self._shard(run_id)
+        with lock:
+            run = runs.get(run_id)
             if not run:
-                return False
+                return None
             
             if brand_kit_data is not None:
                 run.brand_kit_data = brand_kit_data
@@ -252,11 +403,11 @@ class RunManager:
             if final_ad_path is not None:
                 run.final_ad_path = final_ad_path
             
-            run.updated_at = datetime.now(timezone.utc)
+            run.updated_at_ts = time.time()
             
-            return True
+            return run
     
-    def increment_retry(self, run_id: str) -> bool:
+    def increment_retry(self, run_id: str) -> Optional[RunModel]:
         """
         Increment retry count for a run.
         
@@ -264,19 +415,20 @@ class RunManager:
             run_id: Run ID
         
         Returns:
-            True if incremented, False if run not found
+            Updated RunModel, None if run not found
         """
-        with self._lock:
-            run = self._runs.get(run_id)
+        lock, runs = self._shard(run_id)
+        with lock:
+            run = runs.get(run_id)
             if not run:
-                return False
+                return None
             
             run.retry_count += 1
-            run.updated_at = datetime.now(timezone.utc)
+            run.updated_at_ts = time.time()
             
-            return True
+            return run
     
-    def complete_run(self, run_id: str, success: bool = True) -> bool:
+    def complete_run(self, run_id: str, success: bool = True) -> Optional[RunModel]:
         """
         Mark a run as completed.
         
@@ -285,19 +437,46 @@ class RunManager:
             success: Whether the run was successful
         
         Returns:
-            True if completed, False if run not found
+            Updated RunModel, None if run not found
         """
-        with self._lock:
-            run = self._runs.get(run_id)
+        lock, runs = self._shard(run_id)
+        with lock:
+            run = runs.get(run_id)
             if not run:
-                return False
+                return None
             
-            run.status = RunStatus.COMPLETED if success else RunStatus.FAILED
+            self._set_status(run, RunStatus.COMPLETED if success else RunStatus.FAILED)
+            now = time.time()
             run.progress = 100.0
-            run.completed_at = datetime.now(timezone.utc)
-            run.updated_at = datetime.now(timezone.utc)
+            run.completed_at = datetime.fromtimestamp(now, tz=timezone.utc)
+            run.updated_at_ts = now
+            
+            return run
+    
+    def fail_run(self, run_id: str, error: str) -> Optional[RunModel]:
+        """
+        Mark a run as failed outside of any stage (e.g. the workflow raised).
+        
+        Args:
+            run_id: Run ID
+            error: Error message
+        
+        Returns:
+            Updated RunModel, None if run not found
+        """
+        lock, runs = self._shard(run_id)
+        with lock:
+            run = runs.get(run_id)
+            if not run:
+                return None
             
-            return True
+            self._set_status(run, RunStatus.FAILED)
+            now = time.time()
+            run.error_message = error
+            run.completed_at = datetime.fromtimestamp(now, tz=timezone.utc)
+            run.updated_at_ts = now
+            
+            return run
     
     def delete_run(self, run_id: str) -> bool:
         """
@@ -309,11 +488,41 @@ class RunManager:
         Returns:
             True if deleted, False if run not found
         """
-        with self._lock:
-            if run_id in self._runs:
-                del self._runs[run_id]
-                return True
-            return False
+        lock, runs = self._shard(run_id)
+        with lock:
+            return self._remove(runs, run_id)
+    
+    def evict_expired(self) -> int:
+        """
+        Drop finished runs whose retention window has passed.
+        
+        Returns:
+            Number of runs evicted
+        """
+        now = time.time()
+        evicted = 0
+        for lock, runs in zip(self._locks, self._shards):
+            with lock:
+                expired = [
+                    run_id for run_id, run in runs.items()
+                    if run._retention_deadline is not None and run._retention_deadline <= now
+                ]
+                for run_id in expired:
+                    self._remove(runs, run_id)
+                evicted += len(expired)
+        return evicted
+    
+    def _evict_oldest_finished(self, runs: "OrderedDict[str, RunModel]") -> None:
+        """
+        Drop the oldest finished run from a shard (caller holds its lock).
+        
+        Args:
+            runs: Shard dict, ordered oldest first
+        """
+        for run_id, run in runs.items():
+            if run._retention_deadline is not None:
+                self._remove(runs, run_id)
+                return
     
     def list_runs(self, status: Optional[RunStatus] = None) -> list[RunModel]:
         """
@@ -325,20 +534,26 @@ class RunManager:
         Returns:
             List of RunModel instances
         """
-        with self._lock:
-            runs = list(self._runs.values())
-            if status:
-                runs = [r for r in runs if r.status == status]
-            return runs
+        runs: List[RunModel] = []
+        for lock, shard, index in zip(self._locks, self._shards, self._by_status):
+            with lock:
+                if status is None:
+                    runs.extend(shard.values())
+                else:
+                    runs.extend(shard[run_id] for run_id in index[RunStatus(status)])
+        return runs
     
     def _generate_run_id(self) -> str:
         """
-        Generate a unique run ID using UUID.
+        Generate a unique run ID from a random UUID.
+        
+        The 16 UUID bytes are URL-safe base64 encoded without padding,
+        giving a 22-character ID that is safe in URLs and file paths.
         
         Returns:
-            Unique run ID string (UUID format)
+            Unique run ID string (22 characters)
         """
-        return str(uuid.uuid4())
+        return base64.urlsafe_b64encode(uuid.uuid4().bytes).rstrip(b"=").decode("ascii")
 
 
 # Global run manager instance
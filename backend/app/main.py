@@ -1,15 +1,19 @@
 """
 FastAPI application entry point for BrandAI.
 """
+import asyncio
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 
 from app.config import settings
 from app.api import health, routes
 from app.core.exceptions import BrandAIException
+from app.core.run_manager import run_manager
 from app.services.logger import app_logger
+from app.services.storage_service import get_storage_service
 
 # Create FastAPI application
 app = FastAPI(
@@ -17,16 +21,18 @@ app = FastAPI(
     description="AI Critique Engine for Generated Ads",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify actual origins
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+    expose_headers=["ETag"],
 )
 
 # Include routers
@@ -98,6 +104,18 @@ async def general_exception_handler(request: Request, exc: Exception):
     )
 
 
+async def _reap_expired_runs():
+    """Periodically evict finished runs past their retention window and prune unreferenced storage blobs."""
+    while True:
+        await asyncio.sleep(60)
+        evicted = run_manager.evict_expired()
+        if evicted:
+            app_logger.info("Evicted {} expired runs", evicted)
+        pruned = await asyncio.to_thread(get_storage_service().prune_cas)
+        if pruned:
+            app_logger.info("Pruned {} unreferenced storage blobs", pruned)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup."""
@@ -112,12 +130,17 @@ async def startup_event():
     settings.storage_dir.mkdir(parents=True, exist_ok=True)
     # Note: RAG not used - using direct data passing and few-shot prompts instead
     
+    # Start background eviction of finished runs
+    app.state.run_reaper = asyncio.create_task(_reap_expired_runs())
+    
     print(f"🚀 BrandAI API started on {settings.API_HOST}:{settings.API_PORT}")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on application shutdown."""
+    app.state.run_reaper.cancel()
+    routes.shutdown_workflow_executor()
     print("🛑 BrandAI API shutting down")
 
 
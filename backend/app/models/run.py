@@ -1,10 +1,11 @@
 """
 Run status models for tracking ad generation workflow.
 """
+import time
 from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class RunStatus(str, Enum):
@@ -62,9 +63,17 @@ class RunModel(BaseModel):
     
     # Timestamps
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Run creation timestamp")
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Last update timestamp")
+    updated_at_ts: float = Field(default_factory=time.time, description="Last update time as a Unix timestamp")
     completed_at: Optional[datetime] = Field(None, description="Run completion timestamp")
     
+    # Unix time after which a finished run may be evicted from memory
+    _retention_deadline: Optional[float] = PrivateAttr(default=None)
+    
+    @property
+    def updated_at(self) -> datetime:
+        """Last update timestamp, materialized from updated_at_ts."""
+        return datetime.fromtimestamp(self.updated_at_ts, tz=timezone.utc)
+    
     class Config:
         use_enum_values = True
         json_schema_extra = {
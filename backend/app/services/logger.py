@@ -30,6 +30,9 @@ def setup_logger():
         "<level>{message}</level>"
     )
     
+    # Variable-level tracebacks are costly; only enable them in development
+    diagnose = settings.APP_ENV == "development"
+    
     # Console logging
     logger.add(
         sys.stdout,
@@ -37,7 +40,8 @@ def setup_logger():
         level=settings.LOG_LEVEL,
         colorize=True,
         backtrace=True,
-        diagnose=True
+        diagnose=diagnose,
+        enqueue=True  # Don't block callers on terminal I/O
     )
     
     # File logging
@@ -56,7 +60,7 @@ def setup_logger():
         retention="7 days",  # Keep logs for 7 days
         compression="zip",  # Compress old logs
         backtrace=True,
-        diagnose=True,
+        diagnose=diagnose,
         enqueue=True  # Thread-safe logging
     )
     
@@ -69,7 +73,7 @@ def setup_logger():
         retention="30 days",  # Keep error logs longer
         compression="zip",
         backtrace=True,
-        diagnose=True,
+        diagnose=diagnose,
         enqueue=True
     )
     
@@ -2,13 +2,64 @@
 Storage service for handling file operations.
 Manages file uploads, storage, and retrieval for ads, brand assets, and reports.
 """
+import errno
+import fnmatch
+import hashlib
 import os
+import re
 import shutil
+import threading
+import time
+from functools import cache, lru_cache
 from pathlib import Path
-from typing import Optional, List, BinaryIO
-from datetime import datetime
+from typing import Optional, List, BinaryIO, Tuple, Dict, Union
 
 from app.config import settings
+from app.services.uring_backend import create_uring_backend
+
+# Read size used when streaming uploads to disk (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Unreferenced blobs younger than this are left alone by prune_cas: another
+# worker process may have just written one and not linked it yet (seconds)
+CAS_PRUNE_GRACE_SECONDS = 300
+
+# os.link errors meaning hard links can't be used here, so the blob is copied
+# instead (different filesystem, unsupported, or too many links to the blob)
+_LINK_FALLBACK_ERRNOS = frozenset({errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EMLINK})
+
+
+def _unique_suffix() -> str:
+    """
+    Build a filename suffix from the current time in nanoseconds.
+    
+    Hex-encoded so names stay short and still sort by creation time;
+    unlike a per-second timestamp, saves within the same second don't
+    overwrite each other.
+    
+    Returns:
+        Hex timestamp string
+    """
+    return format(time.time_ns(), "x")
+
+
+@lru_cache(maxsize=128)
+def _compile_glob(pattern: str) -> re.Pattern:
+    """
+    Compile a single-segment glob pattern to a regex (cached).
+    
+    Args:
+        pattern: Glob pattern such as "*.png"
+    
+    Returns:
+        Compiled pattern matching whole filenames, case-sensitively
+    """
+    return re.compile(fnmatch.translate(pattern))
+
+
+def _is_nested_glob(pattern: str) -> bool:
+    """Whether a glob pattern spans directories and needs Path.glob."""
+    return "/" in pattern or os.sep in pattern or "**" in pattern
 
 
 class StorageService:
@@ -17,6 +68,12 @@ class StorageService:
     def __init__(self):
         """Initialize storage service with base directory."""
         self.base_dir = settings.storage_dir
+        self._ensured_dirs: set[Path] = set()
+        self._subdir_cache: dict[str, Path] = {}
+        self._cas_dir = self.base_dir / "cas"
+        # Serializes blob writes/links against blob reclamation
+        self._cas_lock = threading.Lock()
+        self._uring = create_uring_backend()
         self._ensure_directories()
     
     def _ensure_directories(self):
@@ -26,10 +83,23 @@ class StorageService:
             self.base_dir / "brand_assets",
             self.base_dir / "reports",
             self.base_dir / "uploads",  # Temporary upload directory
+            self._cas_dir,  # Content-addressed blobs behind ads and brand assets
         ]
         
         for directory in directories:
-            directory.mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(directory)
+    
+    def _ensure_dir(self, directory: Path):
+        """
+        Create a directory (and parents) unless this instance already has.
+        
+        Args:
+            directory: Directory path to ensure
+        """
+        if directory in self._ensured_dirs:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        self._ensured_dirs.add(directory)
     
     def save_file(
         self,
@@ -45,27 +115,13 @@ class StorageService:
             file_content: File content as bytes
             filename: Original filename
             subdirectory: Subdirectory within storage (ads, brand_assets, reports, uploads)
-            create_unique: If True, append timestamp to filename to make it unique
+            create_unique: If True, append a nanosecond timestamp to make the filename unique
         
         Returns:
             Path to saved file
         """
-        # Get target directory
-        target_dir = self.base_dir / subdirectory
-        target_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Create unique filename if needed
-        if create_unique:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            name, ext = os.path.splitext(filename)
-            unique_filename = f"{name}_{timestamp}{ext}"
-        else:
-            unique_filename = filename
-        
-        # Save file
-        file_path = target_dir / unique_filename
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        file_path = self._target_path(filename, subdirectory, create_unique)
+        file_path.write_bytes(file_content)
         
         return file_path
     
@@ -86,9 +142,71 @@ class StorageService:
         Returns:
             Path to saved file
         """
-        # Read file content
-        file_content = uploaded_file.read()
-        return self.save_file(file_content, filename, subdirectory)
+        # Copy in fixed-size chunks rather than reading the whole file into memory
+        file_path = self._target_path(filename, subdirectory)
+        with open(file_path, "wb") as dst:
+            shutil.copyfileobj(uploaded_file, dst, length=UPLOAD_CHUNK_SIZE)
+        
+        return file_path
+    
+    def copy_into_storage(
+        self,
+        src: Path,
+        subdirectory: str,
+        filename: Optional[str] = None,
+        create_unique: bool = True
+    ) -> Path:
+        """
+        Copy a file that is already on disk into storage.
+        
+        Uses shutil.copyfile, which copies in the kernel where the platform
+        allows (sendfile on Linux), so the content is never loaded into
+        Python memory.
+        
+        Args:
+            src: Path of the file to copy
+            subdirectory: Subdirectory within storage
+            filename: Target filename (defaults to src's name)
+            create_unique: If True, append a nanosecond timestamp to make the filename unique
+        
+        Returns:
+            Path to copied file
+        """
+        file_path = self._target_path(filename or src.name, subdirectory, create_unique)
+        shutil.copyfile(src, file_path)
+        
+        return file_path
+    
+    def _target_path(
+        self,
+        filename: str,
+        subdirectory: str,
+        create_unique: bool = True
+    ) -> Path:
+        """
+        Build the path a file should be saved to, creating its directory.
+        
+        Args:
+            filename: Original filename
+            subdirectory: Subdirectory within storage
+            create_unique: If True, append a nanosecond timestamp to make the filename unique
+        
+        Returns:
+            Target file path
+        """
+        # Get target directory
+        target_dir = self.get_storage_path(subdirectory)
+        self._ensure_dir(target_dir)
+        
+        # Create unique filename if needed
+        if create_unique:
+            timestamp = _unique_suffix()
+            fn = Path(filename)
+            unique_filename = f"{fn.stem}_{timestamp}{fn.suffix}"
+        else:
+            unique_filename = filename
+        
+        return target_dir / unique_filename
     
     def get_file_path(self, filename: str, subdirectory: str) -> Optional[Path]:
         """
@@ -101,7 +219,7 @@ class StorageService:
         Returns:
             Path to file if exists, None otherwise
         """
-        file_path = self.base_dir / subdirectory / filename
+        file_path = self.get_storage_path(subdirectory) / filename
         if file_path.exists():
             return file_path
         return None
@@ -116,61 +234,138 @@ class StorageService:
         Returns:
             File content as bytes, None if file doesn't exist
         """
-        if not file_path.exists():
+        try:
+            return file_path.read_bytes()
+        except FileNotFoundError:
             return None
-        
-        with open(file_path, "rb") as f:
-            return f.read()
     
     def delete_file(self, file_path: Path) -> bool:
         """
         Delete a file.
         
+        If the file was a link to a content-addressed blob and was the
+        last one, the blob is deleted too.
+        
         Args:
             file_path: Path to file to delete
         
         Returns:
             True if deleted, False otherwise
         """
-        try:
-            if file_path.exists():
+        with self._cas_lock:
+            try:
+                st = file_path.stat()
+                # Only hard-linked files can share a blob; hash those before unlinking
+                blob = self._blob_path_for_file(file_path) if st.st_nlink > 1 else None
                 file_path.unlink()
-                return True
-            return False
-        except Exception:
-            return False
+            except OSError:
+                # Includes FileNotFoundError when the file is already gone
+                return False
+            
+            if blob is not None:
+                try:
+                    blob_st = blob.stat()
+                    if blob_st.st_ino == st.st_ino and blob_st.st_nlink == 1:
+                        blob.unlink()
+                except OSError:
+                    pass
+        
+        return True
     
-    def list_files(self, subdirectory: str, pattern: Optional[str] = None) -> List[Path]:
+    def list_files(
+        self,
+        subdirectory: str,
+        pattern: Optional[Union[str, List[str]]] = None
+    ) -> Union[List[Path], Dict[str, List[Path]]]:
         """
         List files in a subdirectory.
         
+        Passing a list of patterns reads the directory once and matches
+        every entry against all of them.
+        
         Args:
-            subdirectory: Subdirectory within storage
-            pattern: Optional glob pattern to filter files
+            subdirectory: Subdirectory within storage (absolute paths are used as-is)
+            pattern: Optional glob pattern, or list of patterns, to filter files
         
         Returns:
-            List of file paths
+            List of file paths, or a dict of pattern -> file paths when
+            pattern is a list
         """
-        target_dir = self.base_dir / subdirectory
-        if not target_dir.exists():
-            return []
+        target_dir = self.get_storage_path(subdirectory)
+        
+        if isinstance(pattern, list):
+            return self._match_patterns(target_dir, pattern)
         
-        if pattern:
+        # Nested or recursive patterns need the full glob machinery
+        if pattern and _is_nested_glob(pattern):
             return list(target_dir.glob(pattern))
-        else:
-            return [f for f in target_dir.iterdir() if f.is_file()]
+        
+        # scandir entries carry the file type from the directory read,
+        # so filtering doesn't stat every entry
+        try:
+            with os.scandir(target_dir) as entries:
+                if pattern:
+                    match = _compile_glob(pattern).match
+                    return [Path(e.path) for e in entries if match(e.name)]
+                return [Path(e.path) for e in entries if e.is_file()]
+        except FileNotFoundError:
+            return []
+    
+    def _match_patterns(self, target_dir: Path, patterns: List[str]) -> Dict[str, List[Path]]:
+        """
+        Match several glob patterns against one directory listing.
+        
+        Args:
+            target_dir: Directory to list
+            patterns: Glob patterns to match
+        
+        Returns:
+            Dict of pattern -> matching file paths, in directory order
+        """
+        matches: Dict[str, List[Path]] = {p: [] for p in patterns}
+        
+        simple = []
+        for p in matches:
+            if _is_nested_glob(p):
+                matches[p] = list(target_dir.glob(p))
+            else:
+                simple.append((matches[p], _compile_glob(p).match))
+        
+        if not simple:
+            return matches
+        
+        try:
+            with os.scandir(target_dir) as entries:
+                for entry in entries:
+                    path = None
+                    for found, match in simple:
+                        if match(entry.name):
+                            if path is None:
+                                path = Path(entry.path)
+                            found.append(path)
+        except FileNotFoundError:
+            pass
+        
+        return matches
     
     def get_storage_path(self, subdirectory: str) -> Path:
         """
         Get the full path to a subdirectory.
         
+        The joined Path is cached per subdirectory, so repeated lookups
+        return the same object without re-parsing the path.
+        
         Args:
             subdirectory: Subdirectory name
         
         Returns:
             Path to subdirectory
         """
-        return self.base_dir / subdirectory
+        path = self._subdir_cache.get(subdirectory)
+        if path is None:
+            path = self.base_dir / subdirectory
+            self._subdir_cache[subdirectory] = path
+        return path
     
     def save_ad_variation(
         self,
@@ -193,16 +388,45 @@ class StorageService:
         """
         # Create run-specific directory
         run_dir = self.base_dir / "ads" / run_id
-        run_dir.mkdir(parents=True, exist_ok=True)
+        self._ensure_dir(run_dir)
         
         # Save file
         filename = f"variation_{variation_id}{extension}"
         file_path = run_dir / filename
         
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        return self._link_content(file_content, file_path)
+    
+    def save_ad_variation_batch(
+        self,
+        run_id: str,
+        variations: List[Tuple[str, str, bytes]]
+    ) -> List[Path]:
+        """
+        Save several ad variation files for a run.
         
-        return file_path
+        Uses the same layout as save_ad_variation, but resolves and
+        ensures the run directory once for the whole batch, and writes
+        new content for all variations together (through io_uring when
+        available).
+        
+        Args:
+            run_id: Run ID
+            variations: (variation_id, extension, file_content) tuples
+        
+        Returns:
+            Paths to saved files, in input order
+        """
+        run_dir = self.base_dir / "ads" / run_id
+        self._ensure_dir(run_dir)
+        
+        file_paths = []
+        with self._cas_lock:
+            blobs = self._cas_write_many([file_content for _, _, file_content in variations])
+            for (variation_id, extension, _), blob in zip(variations, blobs):
+                file_path = run_dir / f"variation_{variation_id}{extension}"
+                file_paths.append(self._link_blob(blob, file_path))
+        
+        return file_paths
     
     def save_brand_asset(
         self,
@@ -221,19 +445,197 @@ class StorageService:
         Returns:
             Path to saved file
         """
-        asset_dir = self.base_dir / "brand_assets" / asset_type
-        asset_dir.mkdir(parents=True, exist_ok=True)
+        file_path = self.brand_asset_path(filename, asset_type)
+        
+        return self._link_content(file_content, file_path)
+    
+    def _cas_write(self, data: bytes) -> Path:
+        """
+        Store content once under its hash in the content-addressed store.
+        
+        Args:
+            data: File content
+        
+        Returns:
+            Path to the blob holding data
+        """
+        blob = self._blob_path(data)
+        if not self._reuse_blob(blob):
+            # Write under a temporary name so readers never see a partial blob
+            tmp = self._temp_path(blob)
+            tmp.write_bytes(data)
+            os.replace(tmp, blob)
+        return blob
+    
+    def _cas_write_many(self, contents: List[bytes]) -> List[Path]:
+        """
+        Store several contents in the content-addressed store at once.
+        
+        Blobs that don't exist yet are written as one batch, using the
+        io_uring backend when it's available.
+        
+        Args:
+            contents: File contents
+        
+        Returns:
+            Blob paths, in input order
+        """
+        blobs = [self._blob_path(data) for data in contents]
+        
+        pending = {}
+        for blob, data in zip(blobs, contents):
+            if blob not in pending and not self._reuse_blob(blob):
+                pending[blob] = data
+        if not pending:
+            return blobs
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        name, ext = os.path.splitext(filename)
-        unique_filename = f"{name}_{timestamp}{ext}"
+        writes = [(self._temp_path(blob), data) for blob, data in pending.items()]
+        try:
+            if self._uring is not None:
+                self._uring.write_many(writes)
+            else:
+                for tmp, data in writes:
+                    tmp.write_bytes(data)
+        except OSError:
+            for tmp, _ in writes:
+                tmp.unlink(missing_ok=True)
+            raise
+        
+        for (tmp, _), blob in zip(writes, pending):
+            os.replace(tmp, blob)
+        
+        return blobs
+    
+    @staticmethod
+    def _reuse_blob(blob: Path) -> bool:
+        """
+        Check whether a blob exists, refreshing its mtime if so.
         
-        file_path = asset_dir / unique_filename
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        The fresh mtime keeps prune_cas in other processes away from the
+        blob until it has been linked (see CAS_PRUNE_GRACE_SECONDS).
+        
+        Args:
+            blob: Blob path in the content-addressed store
+        
+        Returns:
+            True if the blob exists, False if it must be written
+        """
+        try:
+            os.utime(blob)
+        except FileNotFoundError:
+            return False
+        return True
+    
+    def _blob_path(self, data: bytes) -> Path:
+        """Content-addressed store path for data."""
+        return self._cas_dir / hashlib.blake2b(data, digest_size=16).hexdigest()
+    
+    def _blob_path_for_file(self, file_path: Path) -> Path:
+        """Content-addressed store path for a file's content (hashed in chunks)."""
+        with open(file_path, "rb") as f:
+            digest = hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16))
+        return self._cas_dir / digest.hexdigest()
+    
+    def prune_cas(self) -> int:
+        """
+        Delete blobs that no stored file links to any more.
+        
+        Catches blobs left behind when linked files are removed other than
+        through delete_file (e.g. a run directory deleted by hand). A blob
+        whose only link is its own store entry is unreferenced. _cas_lock
+        only covers this process, so blobs modified in the last
+        CAS_PRUNE_GRACE_SECONDS are kept: another worker may be about to
+        link them.
+        
+        Returns:
+            Number of blobs deleted
+        """
+        removed = 0
+        cutoff = time.time() - CAS_PRUNE_GRACE_SECONDS
+        with self._cas_lock:
+            try:
+                with os.scandir(self._cas_dir) as entries:
+                    for entry in entries:
+                        # Skip in-flight temporary files
+                        if entry.name.startswith("."):
+                            continue
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                            if st.st_nlink == 1 and st.st_mtime < cutoff:
+                                os.unlink(entry.path)
+                                removed += 1
+                        except OSError:
+                            pass
+            except FileNotFoundError:
+                pass
+        return removed
+    
+    @staticmethod
+    def _temp_path(file_path: Path) -> Path:
+        """Unique hidden sibling of file_path to write to before renaming."""
+        return file_path.with_name(f".{file_path.name}.{_unique_suffix()}.tmp")
+    
+    def _link_content(self, data: bytes, file_path: Path) -> Path:
+        """
+        Make file_path a hard link to the stored blob for data.
+        
+        Identical content is only written to disk once. The link is
+        created under a temporary name and renamed into place, so an
+        existing file at file_path is replaced rather than written
+        through (which would modify the shared blob).
+        
+        Args:
+            data: File content
+            file_path: Named path to create
+        
+        Returns:
+            file_path
+        """
+        with self._cas_lock:
+            return self._link_blob(self._cas_write(data), file_path)
+    
+    def _link_blob(self, blob: Path, file_path: Path) -> Path:
+        """
+        Point file_path at an existing blob (see _link_content).
+        
+        Args:
+            blob: Blob path in the content-addressed store
+            file_path: Named path to create
+        
+        Returns:
+            file_path
+        """
+        tmp = self._temp_path(file_path)
+        try:
+            os.link(blob, tmp)
+        except OSError as e:
+            if e.errno not in _LINK_FALLBACK_ERRNOS:
+                raise
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, file_path)
         
         return file_path
     
+    def brand_asset_path(self, filename: str, asset_type: str) -> Path:
+        """
+        Build a unique target path for a brand asset, creating its directory.
+        
+        Args:
+            filename: Original filename
+            asset_type: Type of asset (logo, product, etc.)
+        
+        Returns:
+            Path the asset should be written to
+        """
+        asset_dir = self.base_dir / "brand_assets" / asset_type
+        self._ensure_dir(asset_dir)
+        
+        timestamp = _unique_suffix()
+        fn = Path(filename)
+        unique_filename = f"{fn.stem}_{timestamp}{fn.suffix}"
+        
+        return asset_dir / unique_filename
+    
     def save_report(
         self,
         report_content: str,
@@ -252,17 +654,34 @@ class StorageService:
             Path to saved file
         """
         report_dir = self.base_dir / "reports" / run_id
-        report_dir.mkdir(parents=True, exist_ok=True)
+        self._ensure_dir(report_dir)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = _unique_suffix()
         filename = f"{report_type}_report_{timestamp}.json"
         file_path = report_dir / filename
         
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(report_content)
+        # Encode once and write the bytes in a single call
+        file_path.write_bytes(report_content.encode("utf-8"))
         
         return file_path
 
 
-# Global storage service instance
-storage_service = StorageService()
+@cache
+def get_storage_service() -> StorageService:
+    """
+    Get the shared storage service, creating it on first use.
+    
+    Creating it lazily keeps the directory setup (and io_uring ring) out
+    of module import, so processes that never touch storage don't pay for it.
+    
+    Returns:
+        Shared StorageService instance
+    """
+    return StorageService()
+
+
+def __getattr__(name):
+    # Keep `from app.services.storage_service import storage_service` working
+    if name == "storage_service":
+        return get_storage_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
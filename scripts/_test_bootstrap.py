@@ -0,0 +1,42 @@
+"""
+Shared setup for the phase test scripts.
+
+Puts the backend on sys.path and sets environment defaults once, and
+exposes the commonly used service singletons. The singletons are imported
+on first access, so a script that only needs the storage service doesn't
+pay for loading the orchestrator and its agents.
+"""
+import importlib
+import os
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).resolve().parent.parent / "backend"
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+os.environ.setdefault("APP_ENV", "development")
+
+# Re-exported name -> module that defines it
+_EXPORTS = {
+    "run_manager": "app.core.run_manager",
+    "RunManager": "app.core.run_manager",
+    "get_storage_service": "app.services.storage_service",
+    "CAS_PRUNE_GRACE_SECONDS": "app.services.storage_service",
+    "app_logger": "app.services.logger",
+    "orchestrator": "app.core.orchestrator",
+    "WorkflowOrchestrator": "app.core.orchestrator",
+    "RunStatus": "app.models.run",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
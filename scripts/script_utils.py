@@ -0,0 +1,65 @@
+"""
+Shared helpers for the manual test scripts.
+"""
+import io
+import os
+import sys
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from typing import List, Tuple
+
+# Test logo/product uploads; override with BRANDAI_UPLOADS_DIR
+DEFAULT_UPLOADS_DIR = Path(__file__).resolve().parent.parent / "data" / "storage" / "uploads"
+
+
+@contextmanager
+def buffered_output():
+    """
+    Collect prints in memory and write them to stdout in a single call.
+    
+    The buffer is written out even if the block raises, so partial output
+    still appears before the traceback.
+    """
+    buffer = io.StringIO()
+    try:
+        with redirect_stdout(buffer):
+            yield
+    finally:
+        sys.stdout.write(buffer.getvalue())
+        sys.stdout.flush()
+
+
+def uploads_dir() -> Path:
+    """
+    Directory holding test logo/product uploads.
+    
+    Returns:
+        BRANDAI_UPLOADS_DIR if set, otherwise the repo's data/storage/uploads
+    """
+    return Path(os.environ.get("BRANDAI_UPLOADS_DIR", DEFAULT_UPLOADS_DIR))
+
+
+def discover_assets(test_dir: Path) -> Tuple[List[Path], List[Path]]:
+    """
+    Find candidate logo and product images in a directory with one scan.
+    
+    Names are matched case-insensitively. Product candidates list files
+    with "product" in the name first, then any other .png/.jpg files.
+    
+    Args:
+        test_dir: Directory holding test uploads
+    
+    Returns:
+        (logo_files, product_files); both empty if test_dir doesn't exist
+    """
+    try:
+        with os.scandir(test_dir) as entries:
+            files = [(Path(e.path), e.name.lower()) for e in entries if e.is_file()]
+    except FileNotFoundError:
+        return [], []
+    
+    logo_files = [path for path, name in files if "logo" in name]
+    named = [path for path, name in files if "product" in name]
+    images = [path for path, name in files if "product" not in name and name.endswith((".png", ".jpg"))]
+    
+    return logo_files, named + images
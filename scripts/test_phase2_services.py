@@ -3,16 +3,13 @@
 Comprehensive test script for Phase 2: Core Services
 Tests Storage Service, Run Manager, and Logger Service.
 """
+import os
 import sys
+import time
 from pathlib import Path
 
-# Add backend to path
-backend_dir = Path(__file__).parent.parent / "backend"
-sys.path.insert(0, str(backend_dir))
-
-from app.services.storage_service import storage_service
-from app.core.run_manager import run_manager
-from app.services.logger import app_logger
+from _test_bootstrap import get_storage_service, run_manager, RunManager, app_logger, RunStatus, CAS_PRUNE_GRACE_SECONDS
+from script_utils import buffered_output
 
 
 def test_storage_service():
@@ -21,6 +18,8 @@ def test_storage_service():
     print("Testing Storage Service...")
     print("=" * 60)
     
+    storage_service = get_storage_service()
+    
     # Test directory creation
     ads_dir = storage_service.get_storage_path("ads")
     assert ads_dir.exists(), "Ads directory should exist"
@@ -52,6 +51,40 @@ def test_storage_service():
     assert ad_path.exists(), "Ad variation should be saved"
     print(f"  ✅ Ad variation saving - PASSED")
     
+    # Test batch ad variation saving
+    batch_paths = storage_service.save_ad_variation_batch(
+        "test_run_123",
+        [("var_2", ".jpg", b"fake image 2"), ("var_3", ".mp4", b"fake video 3")]
+    )
+    assert [p.name for p in batch_paths] == ["variation_var_2.jpg", "variation_var_3.mp4"], "Batch should keep input order"
+    assert all(p.exists() for p in batch_paths), "Batch variations should be saved"
+    print(f"  ✅ Batch ad variation saving - PASSED")
+    
+    # Test content deduplication: identical content shares one stored blob
+    dup_a = storage_service.save_ad_variation(b"duplicate content", "test_run_dedup", "a", ".jpg")
+    dup_b = storage_service.save_ad_variation(b"duplicate content", "test_run_dedup", "b", ".jpg")
+    assert dup_a.stat().st_ino == dup_b.stat().st_ino, "Identical content should be stored once"
+    assert dup_b.read_bytes() == b"duplicate content", "Deduplicated file should keep its content"
+    storage_service.save_ad_variation(b"replaced content", "test_run_dedup", "b", ".jpg")
+    assert dup_a.read_bytes() == b"duplicate content", "Overwriting one copy shouldn't change the other"
+    print("  ✅ Content deduplication - PASSED")
+    
+    # Test blob reclamation: the blob goes with the last file linking to it
+    blob = storage_service._blob_path(b"duplicate content")
+    assert storage_service.delete_file(dup_a), "Deduplicated file should be deleted"
+    assert not blob.exists(), "Blob should be removed with its last link"
+    storage_service.delete_file(dup_b)
+    orphan = storage_service.save_ad_variation(b"orphaned content", "test_run_dedup", "c", ".jpg")
+    orphan.unlink()  # Removed outside delete_file
+    orphan_blob = storage_service._blob_path(b"orphaned content")
+    storage_service.prune_cas()
+    assert orphan_blob.exists(), "Blobs within the grace period should be kept"
+    stale = time.time() - CAS_PRUNE_GRACE_SECONDS - 1
+    os.utime(orphan_blob, (stale, stale))
+    assert storage_service.prune_cas() >= 1, "Unreferenced blob should be pruned"
+    assert not orphan_blob.exists(), "Pruned blob should be gone"
+    print("  ✅ Blob reclamation - PASSED")
+    
     # Test brand asset saving
     asset_path = storage_service.save_brand_asset(
         b"fake logo data",
@@ -75,6 +108,14 @@ def test_storage_service():
     assert len(files) > 0, "Should list files"
     print(f"  ✅ File listing - PASSED ({len(files)} files)")
     
+    # Test multi-pattern listing (one directory read for all patterns)
+    by_pattern = storage_service.list_files("ads/test_run_123", ["*.jpg", "*.mp4", "*.gif"])
+    assert set(by_pattern) == {"*.jpg", "*.mp4", "*.gif"}, "Every pattern should get an entry"
+    assert {p.name for p in by_pattern["*.jpg"]} >= {"variation_var_1.jpg", "variation_var_2.jpg"}, "*.jpg should match the jpg variations"
+    assert [p.name for p in by_pattern["*.mp4"]] == ["variation_var_3.mp4"], "*.mp4 should match only the mp4 variation"
+    assert by_pattern["*.gif"] == [], "Unmatched pattern should map to an empty list"
+    print("  ✅ Multi-pattern file listing - PASSED")
+    
     # Test file deletion
     deleted = storage_service.delete_file(saved_path)
     assert deleted, "File should be deleted"
@@ -92,20 +133,20 @@ def test_run_manager():
     print("=" * 60)
     
     # Test run creation
-    import uuid
+    import base64
+    import binascii
     run = run_manager.create_run(
         prompt="Test ad generation",
         media_type="image",
         brand_website_url="https://example.com"
     )
-    # Validate UUID format
+    # Validate ID format (URL-safe base64 of 16 UUID bytes, unpadded)
     try:
-        uuid.UUID(run.run_id)
-        is_valid_uuid = True
-    except ValueError:
-        is_valid_uuid = False
-    assert is_valid_uuid, "Run ID should be a valid UUID"
-    assert run.status.value == "pending", "Initial status should be pending"
+        is_valid_id = len(run.run_id) == 22 and len(base64.urlsafe_b64decode(run.run_id + "==")) == 16
+    except (binascii.Error, ValueError):
+        is_valid_id = False
+    assert is_valid_id, "Run ID should be a 22-character URL-safe base64 ID"
+    assert RunStatus(run.status) == RunStatus.PENDING, "Initial status should be pending"
     assert run.progress == 0.0, "Initial progress should be 0"
     print(f"  ✅ Run creation - PASSED (ID: {run.run_id})")
     
@@ -116,59 +157,50 @@ def test_run_manager():
     print("  ✅ Run retrieval - PASSED")
     
     # Test status update
-    from app.models.run import RunStatus
-    updated = run_manager.update_status(
+    updated_run = run_manager.update_status(
         run.run_id,
         status=RunStatus.GENERATION,
         progress=25.0,
         current_stage="generation"
     )
-    assert updated, "Status should be updated"
-    updated_run = run_manager.get_run(run.run_id)
+    assert updated_run is not None, "Status should be updated"
     assert updated_run.status == RunStatus.GENERATION or updated_run.status.value == "generation", "Status should be updated"
     assert updated_run.progress == 25.0, "Progress should be updated"
     print("  ✅ Status update - PASSED")
     
     # Test stage management
-    started = run_manager.start_stage(run.run_id, "brand_kit", {"test": "data"})
-    assert started, "Stage should be started"
-    updated_run = run_manager.get_run(run.run_id)
+    updated_run = run_manager.start_stage(run.run_id, "brand_kit", {"test": "data"})
+    assert updated_run is not None, "Stage should be started"
     assert "brand_kit" in updated_run.stages, "Stage should be added"
     print("  ✅ Stage start - PASSED")
     
-    from app.models.run import RunStatus
-    completed = run_manager.complete_stage(run.run_id, "brand_kit")
-    assert completed, "Stage should be completed"
-    updated_run = run_manager.get_run(run.run_id)
+    updated_run = run_manager.complete_stage(run.run_id, "brand_kit")
+    assert updated_run is not None, "Stage should be completed"
     stage_status = updated_run.stages["brand_kit"].status
     assert stage_status == RunStatus.COMPLETED or (hasattr(stage_status, 'value') and stage_status.value == "completed"), "Stage should be completed"
     print("  ✅ Stage completion - PASSED")
     
     # Test run data update
-    updated = run_manager.update_run_data(
+    updated_run = run_manager.update_run_data(
         run.run_id,
         brand_kit_data={"colors": ["#FF0000"]},
         generated_ads=["/path/to/ad1.jpg"],
         critique_results={"score": 0.85}
     )
-    assert updated, "Run data should be updated"
-    updated_run = run_manager.get_run(run.run_id)
+    assert updated_run is not None, "Run data should be updated"
     assert updated_run.brand_kit_data is not None, "Brand kit data should be set"
     assert len(updated_run.generated_ads) > 0, "Generated ads should be set"
     print("  ✅ Run data update - PASSED")
     
     # Test retry increment
     initial_retry = updated_run.retry_count
-    run_manager.increment_retry(run.run_id)
-    updated_run = run_manager.get_run(run.run_id)
+    updated_run = run_manager.increment_retry(run.run_id)
     assert updated_run.retry_count == initial_retry + 1, "Retry count should increment"
     print("  ✅ Retry increment - PASSED")
     
     # Test run completion
-    from app.models.run import RunStatus
-    completed = run_manager.complete_run(run.run_id, success=True)
-    assert completed, "Run should be completed"
-    updated_run = run_manager.get_run(run.run_id)
+    updated_run = run_manager.complete_run(run.run_id, success=True)
+    assert updated_run is not None, "Run should be completed"
     run_status = updated_run.status
     assert run_status == RunStatus.COMPLETED or (hasattr(run_status, 'value') and run_status.value == "completed"), "Status should be completed"
     assert updated_run.progress == 100.0, "Progress should be 100"
@@ -180,6 +212,19 @@ def test_run_manager():
     assert len(all_runs) > 0, "Should list runs"
     print(f"  ✅ Run listing - PASSED ({len(all_runs)} runs)")
     
+    # Test status-filtered listing (served from the status index)
+    other = run_manager.create_run("Pending run", "image")
+    completed_ids = {r.run_id for r in run_manager.list_runs(status=RunStatus.COMPLETED)}
+    pending_ids = {r.run_id for r in run_manager.list_runs(status=RunStatus.PENDING)}
+    assert run.run_id in completed_ids and run.run_id not in pending_ids, "Completed run should be indexed as completed"
+    assert other.run_id in pending_ids and other.run_id not in completed_ids, "New run should be indexed as pending"
+    run_manager.update_status(other.run_id, status=RunStatus.GENERATION)
+    assert other.run_id not in {r.run_id for r in run_manager.list_runs(status=RunStatus.PENDING)}, "Status change should leave the old index entry"
+    assert other.run_id in {r.run_id for r in run_manager.list_runs(status=RunStatus.GENERATION)}, "Status change should add the new index entry"
+    run_manager.delete_run(other.run_id)
+    assert other.run_id not in {r.run_id for r in run_manager.list_runs(status=RunStatus.GENERATION)}, "Deleted run should leave the index"
+    print("  ✅ Status-filtered listing - PASSED")
+    
     # Test run deletion
     deleted = run_manager.delete_run(run.run_id)
     assert deleted, "Run should be deleted"
@@ -190,6 +235,54 @@ def test_run_manager():
     return True
 
 
+def test_run_eviction():
+    """Test TTL and MAX_RUNS eviction of finished runs."""
+    print("=" * 60)
+    print("Testing Run Eviction...")
+    print("=" * 60)
+    
+    # Separate manager so the shared one's runs aren't touched
+    manager = RunManager()
+    
+    # Test TTL eviction
+    finished = manager.create_run("Finished run", "image")
+    pending = manager.create_run("Pending run", "image")
+    manager.complete_run(finished.run_id, success=True)
+    assert manager.evict_expired() == 0, "Runs within their TTL should be kept"
+    finished._retention_deadline = time.time() - 1
+    assert manager.evict_expired() == 1, "Expired finished run should be evicted"
+    assert manager.get_run(finished.run_id) is None, "Evicted run should be gone"
+    assert manager.get_run(pending.run_id) is not None, "Runs in progress should never expire"
+    print("  ✅ TTL eviction - PASSED")
+    
+    # Test that every way of finishing a run starts its retention window
+    failed = manager.create_run("Failed run", "image")
+    cancelled = manager.create_run("Cancelled run", "image")
+    manager.fail_run(failed.run_id, "Workflow raised")
+    manager.update_status(cancelled.run_id, RunStatus.CANCELLED)
+    assert RunStatus(failed.status) == RunStatus.FAILED, "fail_run should mark the run failed"
+    assert failed.error_message == "Workflow raised", "fail_run should record the error"
+    for run in (failed, cancelled):
+        assert run._retention_deadline is not None, f"{run.status} run should get a retention deadline"
+        run._retention_deadline = time.time() - 1
+    assert manager.evict_expired() == 2, "Expired failed and cancelled runs should be evicted"
+    print("  ✅ Failed/cancelled run retention - PASSED")
+    
+    # Test MAX_RUNS cap: each shard keeps one run, oldest finished runs go first
+    manager._max_per_shard = 1
+    for i in range(100):
+        run = manager.create_run(f"Capped run {i}", "image")
+        manager.complete_run(run.run_id, success=True)
+    runs = manager.list_runs()
+    # One finished run per shard, plus the run still pending
+    assert len(runs) <= len(manager._shards) + 1, f"Store should stay capped (got {len(runs)} runs)"
+    assert manager.get_run(pending.run_id) is not None, "Runs in progress should never be capped out"
+    print(f"  ✅ MAX_RUNS cap - PASSED ({len(runs)} runs kept)")
+    
+    print("✅ Run Eviction - ALL TESTS PASSED\n")
+    return True
+
+
 def test_logger():
     """Test logger functionality."""
     print("=" * 60)
@@ -230,7 +323,7 @@ def test_integration():
     app_logger.info(f"Created run: {run.run_id}")
     
     # Save a file for the run
-    file_path = storage_service.save_ad_variation(
+    file_path = get_storage_service().save_ad_variation(
         b"test ad content",
         run.run_id,
         "var_1",
@@ -245,12 +338,10 @@ def test_integration():
     )
     
     # Complete the run
-    run_manager.complete_run(run.run_id, success=True)
+    final_run = run_manager.complete_run(run.run_id, success=True)
     app_logger.info(f"Completed run: {run.run_id}")
     
     # Verify integration
-    from app.models.run import RunStatus
-    final_run = run_manager.get_run(run.run_id)
     assert final_run is not None, "Run should exist"
     assert len(final_run.generated_ads) > 0, "Run should have generated ads"
     final_status = final_run.status
@@ -271,10 +362,14 @@ def main():
     all_passed = True
     
     try:
-        all_passed &= test_storage_service()
-        all_passed &= test_run_manager()
-        all_passed &= test_logger()
-        all_passed &= test_integration()
+        # Only tests that just print are buffered: loguru's console sink
+        # writes to the real stdout, so logged lines would jump ahead of
+        # buffered prints
+        for test in (test_storage_service, test_run_manager, test_run_eviction):
+            with buffered_output():
+                all_passed &= test()
+        for test in (test_logger, test_integration):
+            all_passed &= test()
         
         print("=" * 60)
         if all_passed:
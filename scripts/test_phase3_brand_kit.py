@@ -16,7 +16,6 @@ from app.agents.brand_kit_agent.extractors.logo_extractor import logo_extractor
 from app.agents.brand_kit_agent.extractors.color_extractor import color_extractor
 from app.agents.brand_kit_agent.extractors.external_scraper import external_scraper
 from app.agents.brand_kit_agent.agent import brand_kit_agent
-from app.services.storage_service import storage_service
 
 
 def create_test_image(output_path: Path, width: int = 200, height: int = 200, color: tuple = (255, 0, 0)):
@@ -236,6 +235,15 @@ def test_brand_kit_agent():
     assert "extracted_at" in brand_kit_upload, "Should have timestamp"
     print(f"  ✅ File upload extraction - PASSED")
     
+    # Test with file uploads (paths on disk)
+    brand_kit_copy = brand_kit_agent.extract_from_uploads(
+        brand_logo_file=logo_path,
+        product_image_file=product_path,
+        run_id="test_run_123"
+    )
+    assert "extracted_at" in brand_kit_copy, "Should have timestamp"
+    print(f"  ✅ File path extraction - PASSED")
+    
     # Cleanup
     logo_path.unlink()
     product_path.unlink()
@@ -3,19 +3,11 @@ Test script for Phase 7: LangGraph Orchestration
 Tests the complete workflow orchestrator.
 """
 import sys
-import os
 from pathlib import Path
 import uuid
 
-# Add backend to path
-backend_dir = Path(__file__).parent.parent / "backend"
-sys.path.insert(0, str(backend_dir))
-
-os.environ.setdefault("APP_ENV", "development")
-
-from app.core.orchestrator import orchestrator, WorkflowOrchestrator
-from app.core.run_manager import run_manager
-from app.services.logger import app_logger
+from _test_bootstrap import orchestrator, WorkflowOrchestrator, run_manager, app_logger
+from script_utils import buffered_output, discover_assets, uploads_dir
 
 
 def test_orchestrator_initialization():
@@ -50,13 +42,12 @@ def test_workflow_execution():
     print()
     
     # Check for test assets
-    test_dir = Path("/Users/udaygattu/Documents/Hackathon/BrandAI-fork/data/storage/uploads")
+    test_dir = uploads_dir()
     logo_path = None
     product_path = None
     
     if test_dir.exists():
-        logo_files = list(test_dir.glob("*logo*")) + list(test_dir.glob("*Logo*"))
-        product_files = list(test_dir.glob("*product*")) + list(test_dir.glob("*Product*")) + list(test_dir.glob("*.png")) + list(test_dir.glob("*.jpg"))
+        logo_files, product_files = discover_assets(test_dir)
         
         if logo_files:
             logo_path = str(logo_files[0])
@@ -104,32 +95,33 @@ def test_workflow_execution():
             max_retries=3
         )
         
-        print("✅ Workflow execution completed!")
-        print()
-        print("📊 Results:")
-        print(f"   Status: {result.get('status', 'N/A')}")
-        print(f"   Success: {result.get('success', False)}")
-        print(f"   Retry Count: {result.get('retry_count', 0)}")
-        
-        if result.get('generated_ad_path'):
-            print(f"   Generated Ad: {result.get('generated_ad_path')}")
-        
-        if result.get('overall_score') is not None:
-            print(f"   Overall Score: {result.get('overall_score', 0):.2f}")
-        
-        if result.get('error'):
-            print(f"   Error: {result.get('error')}")
-        
-        print()
-        
-        # Check run status
-        run = run_manager.get_run(run_id)
-        if run:
-            print("📋 Run Status:")
-            print(f"   Status: {run.status}")
-            print(f"   Progress: {run.progress}%")
-            print(f"   Current Stage: {run.current_stage}")
+        with buffered_output():
+            print("✅ Workflow execution completed!")
             print()
+            print("📊 Results:")
+            print(f"   Status: {result.get('status', 'N/A')}")
+            print(f"   Success: {result.get('success', False)}")
+            print(f"   Retry Count: {result.get('retry_count', 0)}")
+            
+            if result.get('generated_ad_path'):
+                print(f"   Generated Ad: {result.get('generated_ad_path')}")
+            
+            if result.get('overall_score') is not None:
+                print(f"   Overall Score: {result.get('overall_score', 0):.2f}")
+            
+            if result.get('error'):
+                print(f"   Error: {result.get('error')}")
+            
+            print()
+            
+            # Check run status
+            run = run_manager.get_run(run_id)
+            if run:
+                print("📋 Run Status:")
+                print(f"   Status: {run.status}")
+                print(f"   Progress: {run.progress}%")
+                print(f"   Current Stage: {run.current_stage}")
+                print()
         
         return result.get('success', False)
     
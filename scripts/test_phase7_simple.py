@@ -15,6 +15,7 @@ os.environ.setdefault("APP_ENV", "development")
 from app.core.orchestrator import orchestrator
 from app.core.run_manager import run_manager
 from app.services.logger import app_logger
+from script_utils import discover_assets, uploads_dir
 
 print("=" * 70)
 print("Phase 7: Simple Orchestrator Test")
@@ -33,13 +34,12 @@ print(f"✅ Run created: {run_id}")
 print()
 
 # Check for test assets
-test_dir = Path("/Users/udaygattu/Documents/Hackathon/BrandAI-fork/data/storage/uploads")
+test_dir = uploads_dir()
 logo_path = None
 product_path = None
 
 if test_dir.exists():
-    logo_files = list(test_dir.glob("*logo*")) + list(test_dir.glob("*Logo*"))
-    product_files = list(test_dir.glob("*product*")) + list(test_dir.glob("*Product*")) + list(test_dir.glob("*.png")) + list(test_dir.glob("*.jpg"))
+    logo_files, product_files = discover_assets(test_dir)
     
     if logo_files:
         logo_path = str(logo_files[0])
@@ -1,18 +1,10 @@
 """
 Test Phase 7 Orchestrator with Video Generation
 """
-import sys
-import os
 from pathlib import Path
 
-# Add backend to path
-backend_dir = Path(__file__).parent.parent / "backend"
-sys.path.insert(0, str(backend_dir))
-
-os.environ.setdefault("APP_ENV", "development")
-
-from app.core.orchestrator import orchestrator
-from app.core.run_manager import run_manager
+from _test_bootstrap import orchestrator, run_manager
+from script_utils import buffered_output, discover_assets, uploads_dir
 
 print("=" * 70)
 print("Phase 7: Video Generation Test")
@@ -31,13 +23,12 @@ print(f"✅ Run created: {run_id}")
 print()
 
 # Check for test assets
-test_dir = Path("/Users/udaygattu/Documents/Hackathon/BrandAI-fork/data/storage/uploads")
+test_dir = uploads_dir()
 logo_path = None
 product_path = None
 
 if test_dir.exists():
-    logo_files = list(test_dir.glob("*logo*")) + list(test_dir.glob("*Logo*"))
-    product_files = list(test_dir.glob("*product*")) + list(test_dir.glob("*Product*")) + list(test_dir.glob("*.png")) + list(test_dir.glob("*.jpg"))
+    logo_files, product_files = discover_assets(test_dir)
     
     if logo_files:
         logo_path = str(logo_files[0])
@@ -68,26 +59,27 @@ try:
         max_retries=3
     )
     
-    print()
-    print("-" * 70)
-    print("✅ Workflow execution completed!")
-    print()
-    print("📊 Results:")
-    print(f"   Status: {result.get('status', 'N/A')}")
-    print(f"   Success: {result.get('success', False)}")
-    print(f"   Retry Count: {result.get('retry_count', 0)}")
-    
-    if result.get('generated_ad_path'):
-        print(f"   Generated Video: {result.get('generated_ad_path')}")
-    
-    if result.get('overall_score') is not None:
-        print(f"   Overall Score: {result.get('overall_score', 0):.2f}")
-    
-    if result.get('error'):
-        print(f"   Error: {result.get('error')}")
-    
-    print()
-    print("=" * 70)
+    with buffered_output():
+        print()
+        print("-" * 70)
+        print("✅ Workflow execution completed!")
+        print()
+        print("📊 Results:")
+        print(f"   Status: {result.get('status', 'N/A')}")
+        print(f"   Success: {result.get('success', False)}")
+        print(f"   Retry Count: {result.get('retry_count', 0)}")
+        
+        if result.get('generated_ad_path'):
+            print(f"   Generated Video: {result.get('generated_ad_path')}")
+        
+        if result.get('overall_score') is not None:
+            print(f"   Overall Score: {result.get('overall_score', 0):.2f}")
+        
+        if result.get('error'):
+            print(f"   Error: {result.get('error')}")
+        
+        print()
+        print("=" * 70)
 
 except Exception as e:
     print()
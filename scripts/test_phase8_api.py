@@ -4,8 +4,15 @@ Tests all API endpoints.
 """
 import sys
 import os
+import asyncio
+import contextlib
+import io
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
+import uuid
 from pathlib import Path
 
 # Add backend to path
@@ -14,211 +21,422 @@ sys.path.insert(0, str(backend_dir))
 
 os.environ.setdefault("APP_ENV", "development")
 
-print("=" * 70)
-print("Phase 8: API Endpoints - Test")
-print("=" * 70)
-print()
+from script_utils import buffered_output, discover_assets, uploads_dir
+from app.config import settings
 
 # Test server URL
 BASE_URL = "http://localhost:8000"
 API_BASE = f"{BASE_URL}/api/v1"
 
-print(f"🌐 Testing API at: {BASE_URL}")
-print(f"📚 API Docs: {BASE_URL}/docs")
-print()
+# Section banners
+DASH = "-" * 70
+EQ = "=" * 70
 
-# Test 1: Health Check
-print("-" * 70)
-print("TEST 1: Health Check")
-print("-" * 70)
-print()
+# (connect, read) timeouts: fail fast if the server is down, allow slow responses
+TIMEOUT = (1.0, 5.0)
+UPLOAD_TIMEOUT = (1.0, 60.0)
 
-try:
-    response = requests.get(f"{BASE_URL}/health", timeout=5)
-    if response.status_code == 200:
-        print("✅ Health check passed")
-        print(f"   Response: {response.json()}")
-    else:
-        print(f"❌ Health check failed: {response.status_code}")
-        print(f"   Response: {response.text}")
-except requests.exceptions.ConnectionError:
-    print("❌ Cannot connect to server. Is the server running?")
-    print("   Start server with: python -m app.main")
-    print()
-    print("   Or use: ./scripts/run_backend.sh")
-    sys.exit(1)
-except Exception as e:
-    print(f"❌ Error: {e}")
+# Retry GETs on connection errors and gateway 5xx responses. POST /generate
+# is not retried: it starts a new run, and its streamed body can't be replayed.
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.2,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset(["GET"]),
+    raise_on_status=False
+)
 
-print()
+# One session for all requests so the keep-alive connection is reused
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=RETRY))
 
-# Test 2: Detailed Health Check
-print("-" * 70)
-print("TEST 2: Detailed Health Check")
-print("-" * 70)
-print()
+# Status polling: back off from POLL_INITIAL_DELAY to POLL_MAX_DELAY seconds
+# until the run finishes or POLL_DEADLINE seconds have passed
+POLL_INITIAL_DELAY = 1.0
+POLL_MAX_DELAY = 10.0
+POLL_DEADLINE = 300.0
 
-try:
-    response = requests.get(f"{BASE_URL}/health/detailed", timeout=5)
-    if response.status_code == 200:
-        print("✅ Detailed health check passed")
-        data = response.json()
-        print(f"   Status: {data.get('status')}")
-        print(f"   Environment: {data.get('environment')}")
-        print(f"   Config: {data.get('config')}")
-    else:
-        print(f"❌ Detailed health check failed: {response.status_code}")
-except Exception as e:
-    print(f"❌ Error: {e}")
 
-print()
+def sse_events(response, deadline):
+    """
+    Yield the JSON payload of each Server-Sent Event in a streamed response.
+    
+    Stops once time.monotonic() passes deadline. Every line counts, keep-alive
+    comments included, so a stream that stays open without finishing can't
+    outlast it.
+    """
+    for line in response.iter_lines(decode_unicode=True):
+        if time.monotonic() >= deadline:
+            return
+        if line and line.startswith("data:"):
+            yield orjson.loads(line[5:].strip())
 
-# Test 3: Root Endpoint
-print("-" * 70)
-print("TEST 3: Root Endpoint")
-print("-" * 70)
-print()
 
-try:
-    response = requests.get(f"{API_BASE}/", timeout=5)
-    if response.status_code == 200:
-        print("✅ Root endpoint works")
-        print(f"   Response: {response.json()}")
-    else:
-        print(f"❌ Root endpoint failed: {response.status_code}")
-except Exception as e:
-    print(f"❌ Error: {e}")
+async def fetch_all(urls):
+    """GET several URLs concurrently through the shared session (exceptions are returned, not raised)."""
+    return await asyncio.gather(
+        *(asyncio.to_thread(SESSION.get, url, timeout=TIMEOUT) for url in urls),
+        return_exceptions=True
+    )
 
-print()
 
-# Test 4: POST /generate (with file uploads)
-print("-" * 70)
-print("TEST 4: POST /generate Endpoint")
-print("-" * 70)
-print()
-
-# Check for test files
-test_dir = Path("/Users/udaygattu/Documents/Hackathon/BrandAI-fork/data/storage/uploads")
-logo_file = None
-product_file = None
-
-if test_dir.exists():
-    logo_files = list(test_dir.glob("*logo*")) + list(test_dir.glob("*Logo*"))
-    product_files = list(test_dir.glob("*product*")) + list(test_dir.glob("*Product*")) + list(test_dir.glob("*.png")) + list(test_dir.glob("*.jpg"))
-    
-    if logo_files:
-        logo_file = logo_files[0]
-        print(f"📁 Logo file: {logo_file.name}")
-    if product_files:
-        for pf in product_files:
-            if pf != logo_file:
-                product_file = pf
-                print(f"📁 Product file: {product_file.name}")
-                break
-
-print()
+def multipart_body(fields, files, boundary, chunk_size=64 * 1024):
+    """
+    Yield a multipart/form-data body piece by piece.
+    
+    File contents are read in chunk_size blocks while the body is being
+    sent, so uploads are never held in memory in full. Fields whose value
+    is None are left out, as requests does for form data. files maps field
+    name -> (filename, fileobj, content_type); pass a list of (name, tuple)
+    pairs instead to repeat a field.
+    """
+    for name, value in fields.items():
+        if value is None:
+            continue
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode("utf-8")
+    for name, (filename, fileobj, content_type) in (files.items() if isinstance(files, dict) else files):
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+            yield chunk
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("utf-8")
 
-try:
-    # Prepare form data
-    files = {}
-    if logo_file:
-        files["logo"] = (logo_file.name, open(logo_file, "rb"), "image/jpeg")
-    if product_file:
-        files["product"] = (product_file.name, open(product_file, "rb"), "image/png")
-    
-    data = {
-        "prompt": "Nike shoe advertisement showcasing athletic performance and style",
-        "media_type": "image",
-        "brand_website_url": None
+
+def parse_json(response):
+    """Decode a response body with orjson."""
+    return orjson.loads(response.content)
+
+
+def check_not_modified(label, url):
+    """Repeat a GET with its ETag and report whether the server answers 304."""
+    etag = SESSION.get(url, timeout=TIMEOUT).headers.get("ETag")
+    if not etag:
+        return f"❌ {label.capitalize()} response has no ETag"
+    response = SESSION.get(url, headers={"If-None-Match": etag}, timeout=TIMEOUT)
+    if response.status_code == 304 and response.headers.get("ETag") == etag:
+        return f"✅ Unchanged {label} answered with 304 Not Modified"
+    return f"❌ Conditional {label} request: expected 304, got {response.status_code}"
+
+
+def post_generate(fields, files):
+    """POST /generate with a streamed multipart body (sent chunked)."""
+    boundary = uuid.uuid4().hex
+    return SESSION.post(
+        f"{API_BASE}/generate",
+        data=multipart_body(fields, files, boundary),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        timeout=UPLOAD_TIMEOUT  # Longer read timeout for file uploads
+    )
+
+
+def brand_asset_count():
+    """Count files under the brand asset directories of this checkout's storage."""
+    return sum(len(files) for _, _, files in os.walk(settings.storage_dir / "brand_assets"))
+
+
+def unwrap(result):
+    """Return a fetch_all result, re-raising it if the request failed."""
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+with buffered_output():
+    print(EQ)
+    print("Phase 8: API Endpoints - Test")
+    print(EQ)
+    print()
+    print(f"🌐 Testing API at: {BASE_URL}")
+    print(f"📚 API Docs: {BASE_URL}/docs")
+    print()
+
+# Tests 1-3 are independent, so send them together and report in order
+health_result, detailed_result, root_result = asyncio.run(fetch_all([
+    f"{BASE_URL}/health",
+    f"{BASE_URL}/health/detailed",
+    f"{API_BASE}/",
+]))
+
+# Each report section is written to stdout in one go
+with buffered_output():
+    # Test 1: Health Check
+    print(DASH)
+    print("TEST 1: Health Check")
+    print(DASH)
+    print()
+    
+    try:
+        response = unwrap(health_result)
+        if response.status_code == 200:
+            print("✅ Health check passed")
+            print(f"   Response: {parse_json(response)}")
+        else:
+            print(f"❌ Health check failed: {response.status_code}")
+            print(f"   Response: {response.text}")
+    except requests.exceptions.ConnectionError:
+        print("❌ Cannot connect to server. Is the server running?")
+        print("   Start server with: python -m app.main")
+        print()
+        print("   Or use: ./scripts/run_backend.sh")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
+    print()
+    
+    # Test 2: Detailed Health Check
+    print(DASH)
+    print("TEST 2: Detailed Health Check")
+    print(DASH)
+    print()
+    
+    try:
+        response = unwrap(detailed_result)
+        if response.status_code == 200:
+            print("✅ Detailed health check passed")
+            data = parse_json(response)
+            print(f"   Status: {data.get('status')}")
+            print(f"   Environment: {data.get('environment')}")
+            print(f"   Config: {data.get('config')}")
+        else:
+            print(f"❌ Detailed health check failed: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
+    print()
+    
+    # Test 3: Root Endpoint
+    print(DASH)
+    print("TEST 3: Root Endpoint")
+    print(DASH)
+    print()
+    
+    try:
+        response = unwrap(root_result)
+        if response.status_code == 200:
+            print("✅ Root endpoint works")
+            print(f"   Response: {parse_json(response)}")
+        else:
+            print(f"❌ Root endpoint failed: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
+    print()
+
+# Prepare form data
+data = {
+    "prompt": "Nike shoe advertisement showcasing athletic performance and style",
+    "media_type": "image",
+    "brand_website_url": None
+}
+
+# Test 4a: rejected uploads must not leave files behind (counts files in
+# this checkout's storage, so it assumes the server runs from it)
+with buffered_output():
+    print(DASH)
+    print("TEST 4a: Rejected Uploads")
+    print(DASH)
+    print()
+    
+    rejected_uploads = {
+        "bad file extension": [
+            ("logo", ("logo.png", io.BytesIO(b"fake logo"), "image/png")),
+            ("product", ("notes.txt", io.BytesIO(b"not an image"), "text/plain")),
+        ],
+        "repeated file field": [
+            ("logo", ("logo.png", io.BytesIO(b"fake logo"), "image/png")),
+            ("logo", ("logo2.png", io.BytesIO(b"another logo"), "image/png")),
+        ],
     }
+    for label, upload in rejected_uploads.items():
+        try:
+            before = brand_asset_count()
+            response = post_generate(data, upload)
+            left_behind = brand_asset_count() - before
+            if response.status_code == 400 and left_behind == 0:
+                print(f"✅ Upload with {label} rejected, no files left behind")
+            else:
+                print(f"❌ Upload with {label}: status {response.status_code}, {left_behind} file(s) left behind")
+        except Exception as e:
+            print(f"❌ Error: {e}")
     
-    print("🚀 Sending POST /generate request...")
-    print(f"   Prompt: {data['prompt']}")
-    print(f"   Media Type: {data['media_type']}")
+    print()
+
+# Test 4: POST /generate (with file uploads)
+with buffered_output():
+    print(DASH)
+    print("TEST 4: POST /generate Endpoint")
+    print(DASH)
     print()
     
-    response = requests.post(
-        f"{API_BASE}/generate",
-        data=data,
-        files=files,
-        timeout=60  # Increased timeout for file uploads
-    )
+    # Check for test files
+    test_dir = uploads_dir()
+    logo_file = None
+    product_file = None
     
-    # Close file handles
-    for file_tuple in files.values():
-        if hasattr(file_tuple[1], 'close'):
-            file_tuple[1].close()
+    if test_dir.exists():
+        logo_files, product_files = discover_assets(test_dir)
+        
+        if logo_files:
+            logo_file = logo_files[0]
+            print(f"📁 Logo file: {logo_file.name}")
+        if product_files:
+            for pf in product_files:
+                if pf != logo_file:
+                    product_file = pf
+                    print(f"📁 Product file: {product_file.name}")
+                    break
+    
+    print()
+
+try:
+    # Files are closed when the block exits, even if the request fails
+    with contextlib.ExitStack() as stack:
+        files = {}
+        if logo_file:
+            files["logo"] = (logo_file.name, stack.enter_context(open(logo_file, "rb")), "image/jpeg")
+        if product_file:
+            files["product"] = (product_file.name, stack.enter_context(open(product_file, "rb")), "image/png")
+        
+        with buffered_output():
+            print("🚀 Sending POST /generate request...")
+            print(f"   Prompt: {data['prompt']}")
+            print(f"   Media Type: {data['media_type']}")
+            print()
+        
+        # Stream the multipart body instead of letting requests build it in memory
+        response = post_generate(data, files)
     
     if response.status_code == 200:
-        result = response.json()
+        result = parse_json(response)
         run_id = result.get("run_id")
-        print("✅ Generation request accepted!")
-        print(f"   Run ID: {run_id}")
-        print(f"   Status: {result.get('status')}")
-        print(f"   Message: {result.get('message')}")
-        print(f"   Estimated Time: {result.get('estimated_time')} seconds")
-        print()
+        status_url = f"{API_BASE}/status/{run_id}"
+        result_url = f"{API_BASE}/result/{run_id}"
         
-        # Test 5: GET /status/{run_id}
-        print("-" * 70)
-        print("TEST 5: GET /status/{run_id} Endpoint")
-        print("-" * 70)
-        print()
+        with buffered_output():
+            print("✅ Generation request accepted!")
+            print(f"   Run ID: {run_id}")
+            print(f"   Status: {result.get('status')}")
+            print(f"   Message: {result.get('message')}")
+            print(f"   Estimated Time: {result.get('estimated_time')} seconds")
+            print()
+            
+            # Test 5: GET /status/{run_id}
+            print(DASH)
+            print("TEST 5: GET /status/{run_id} Endpoint")
+            print(DASH)
+            print()
+            
+            print(f"📊 Checking status for run: {run_id}")
+            print("   (This will take several minutes for the workflow to complete)")
+            print()
         
-        print(f"📊 Checking status for run: {run_id}")
-        print("   (This will take several minutes for the workflow to complete)")
-        print()
+        # Follow the run over Server-Sent Events; fall back to polling if
+        # the server has no stream endpoint. Both stop at the same deadline.
+        deadline = time.monotonic() + POLL_DEADLINE
+        final_status = None
+        streamed = False
+        try:
+            with SESSION.get(f"{status_url}/stream", stream=True, timeout=(TIMEOUT[0], 60.0)) as stream_response:
+                if stream_response.status_code == 200:
+                    streamed = True
+                    for i, status_data in enumerate(sse_events(stream_response, deadline), 1):
+                        status = status_data.get('status')
+                        print(f"   Update {i}: Status = {status}, Progress = {status_data.get('progress')}%")
+                        if status in ('completed', 'failed'):
+                            final_status = status_data
+                            break
+                else:
+                    print(f"   Status stream unavailable ({stream_response.status_code}), polling instead")
+        except Exception as e:
+            print(f"   Status stream error - {e}")
+            streamed = False
         
-        # Poll status a few times
-        for i in range(5):
-            time.sleep(5)  # Wait 5 seconds between checks
-            
-            try:
-                status_response = requests.get(f"{API_BASE}/status/{run_id}", timeout=5)
-                if status_response.status_code == 200:
-                    status_data = status_response.json()
-                    print(f"   Check {i+1}: Status = {status_data.get('status')}, Progress = {status_data.get('progress')}%")
-                    
-                    if status_data.get('status') == 'completed':
-                        print()
-                        print("✅ Workflow completed!")
-                        
-                        # Test 6: GET /result/{run_id}
-                        print("-" * 70)
-                        print("TEST 6: GET /result/{run_id} Endpoint")
-                        print("-" * 70)
-                        print()
-                        
-                        try:
-                            result_response = requests.get(f"{API_BASE}/result/{run_id}", timeout=5)
-                            if result_response.status_code == 200:
-                                result_data = result_response.json()
-                                print("✅ Result retrieved successfully!")
-                                print(f"   Status: {result_data.get('status')}")
-                                print(f"   Success: {result_data.get('success')}")
-                                if result_data.get('critique_report'):
-                                    print(f"   Critique Report: Available")
-                                    report = result_data['critique_report']
-                                    print(f"   Overall Score: {report.get('all_variations', [{}])[0].get('overall_score', 'N/A')}")
-                            else:
-                                print(f"❌ Result endpoint failed: {result_response.status_code}")
-                        except Exception as e:
-                            print(f"❌ Error getting result: {e}")
-                        
-                        break
-                    elif status_data.get('status') == 'failed':
-                        print()
-                        print(f"❌ Workflow failed: {status_data.get('message')}")
-                        break
+        if streamed:
+            if final_status:
+                print("✅ Status stream ended on a terminal event")
+            elif time.monotonic() >= deadline:
+                print(f"❌ Gave up on the status stream after {POLL_DEADLINE:.0f} seconds")
+            else:
+                print("❌ Status stream closed before the run finished")
+            with SESSION.get(f"{API_BASE}/status/no-such-run/stream", stream=True, timeout=TIMEOUT) as missing_response:
+                if missing_response.status_code == 404:
+                    print("✅ Status stream for an unknown run answered with 404")
                 else:
-                    print(f"   Check {i+1}: Status endpoint returned {status_response.status_code}")
-            except Exception as e:
-                print(f"   Check {i+1}: Error - {e}")
+                    print(f"❌ Status stream for an unknown run: expected 404, got {missing_response.status_code}")
         
-        print()
-        print("💡 Note: Workflow may still be running. Check status later with:")
-        print(f"   GET {API_BASE}/status/{run_id}")
+        if not streamed:
+            # Poll with exponential backoff until the run finishes or the deadline passes
+            delay = POLL_INITIAL_DELAY
+            i = 0
+            while time.monotonic() < deadline:
+                time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+                delay = min(delay * 2, POLL_MAX_DELAY)
+                i += 1
+                
+                try:
+                    status_response = SESSION.get(status_url, timeout=TIMEOUT)
+                    if status_response.status_code == 200:
+                        status_data = parse_json(status_response)
+                        status = status_data.get('status')
+                        print(f"   Check {i}: Status = {status}, Progress = {status_data.get('progress')}%")
+                        
+                        if status in ('completed', 'failed'):
+                            final_status = status_data
+                            break
+                    else:
+                        print(f"   Check {i}: Status endpoint returned {status_response.status_code}")
+                except Exception as e:
+                    print(f"   Check {i}: Error - {e}")
+            else:
+                print(f"   Gave up waiting after {POLL_DEADLINE:.0f} seconds")
         
+        with buffered_output():
+            final_state = final_status.get('status') if final_status else None
+            if final_state == 'completed':
+                print()
+                print("✅ Workflow completed!")
+                
+                # Test 6: GET /result/{run_id}
+                print(DASH)
+                print("TEST 6: GET /result/{run_id} Endpoint")
+                print(DASH)
+                print()
+                
+                try:
+                    result_response = SESSION.get(result_url, timeout=TIMEOUT)
+                    if result_response.status_code == 200:
+                        result_data = parse_json(result_response)
+                        print("✅ Result retrieved successfully!")
+                        print(f"   Status: {result_data.get('status')}")
+                        print(f"   Success: {result_data.get('success')}")
+                        report = result_data.get('critique_report')
+                        if report:
+                            print(f"   Critique Report: Available")
+                            first = (report.get('all_variations') or [{}])[0]
+                            print(f"   Overall Score: {first.get('overall_score', 'N/A')}")
+                        print(check_not_modified("status", status_url))
+                        print(check_not_modified("result", result_url))
+                    else:
+                        print(f"❌ Result endpoint failed: {result_response.status_code}")
+                except Exception as e:
+                    print(f"❌ Error getting result: {e}")
+            elif final_status:
+                print()
+                print(f"❌ Workflow failed: {final_status.get('message')}")
+            
+            print()
+            print("💡 Note: Workflow may still be running. Check status later with:")
+            print(f"   GET {status_url}")
+    
     else:
         print(f"❌ Generation request failed: {response.status_code}")
         print(f"   Response: {response.text}")
@@ -228,10 +446,13 @@ except Exception as e:
     import traceback
     traceback.print_exc()
 
-print()
-print("=" * 70)
-print("Phase 8 API Endpoints Test Complete!")
-print("=" * 70)
-print()
-print("📚 API Documentation available at: http://localhost:8000/docs")
+with buffered_output():
+    print()
+    print(EQ)
+    print("Phase 8 API Endpoints Test Complete!")
+    print(EQ)
+    print()
+    print("📚 API Documentation available at: http://localhost:8000/docs")
+
+SESSION.close()
 